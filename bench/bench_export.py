@@ -0,0 +1,104 @@
+"""Сравнение форматов выгрузки по скорости записи и размеру файла.
+
+Запуск из корня проекта (файлы выгрузки создаются во временном каталоге и удаляются):
+
+    python -m bench.bench_export --rows 1000000
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import tempfile
+import time
+from collections.abc import AsyncIterator
+
+from src.DB_manager import WeatherRow
+from src.Excel_manager import ExcelManager
+from src.Export_manager import EXPORT_FORMATS, BaseExporter, get_exporter, pa
+
+BATCH_SIZE = 10000
+
+
+def make_weather_rows(start: int, end: int) -> list[WeatherRow]:
+    """Возвращает записи о погоде с идентификаторами от start до end (не включительно) с шагом измерений 1 минута.
+
+    Args:
+        start (int): идентификатор первой записи.
+        end (int): идентификатор, следующий за последней записью.
+
+    Returns:
+        list[WeatherRow]: записи о погоде.
+    """
+
+    return [
+        WeatherRow(
+            index, 52.54, 13.41, "GMT", 0, 1704067200 + index * 60, 1704067200 + index * 60,
+            1.5 + index % 7, 0.1 * (index % 3), "отсутствуют", 750.0 + index % 11, 2.0, "С", 0.0,
+            1704067200 + index * 60, 1,
+        )
+        for index in range(start, end)
+    ]
+
+
+async def iter_batches(rows: int) -> AsyncIterator[list[WeatherRow]]:
+    """Асинхронно выдает пакеты по BATCH_SIZE записей.
+
+    Args:
+        rows (int): общее количество записей.
+
+    Yields:
+        list[WeatherRow]: пакет записей о погоде.
+    """
+
+    for start in range(0, rows, BATCH_SIZE):
+        yield make_weather_rows(start, min(rows, start + BATCH_SIZE))
+
+
+async def measure(exporter: BaseExporter, rows: int) -> tuple[float, int]:
+    """Асинхронно выгружает записи и возвращает время выгрузки (с) и размер файла (байт).
+
+    Args:
+        exporter (BaseExporter): выгрузка в файл.
+        rows (int): количество записей.
+
+    Returns:
+        tuple[float, int]: время выгрузки и размер файла.
+    """
+
+    started_at = time.perf_counter()
+    file_name = await exporter.start_export(iter_batches(rows))
+    elapsed = time.perf_counter() - started_at
+    size = os.path.getsize(file_name)
+    os.remove(file_name)
+
+    return elapsed, size
+
+
+async def main(rows: int) -> None:
+    """Асинхронно сравнивает форматы выгрузки.
+
+    Args:
+        rows (int): количество записей.
+    """
+
+    exporters = {"xlsx": ExcelManager()}
+    exporters.update({name: get_exporter(name) for name in EXPORT_FORMATS if name != "parquet" or pa is not None})
+
+    print(f"{'Формат':8} {'Время, с':>9} {'Записей/с':>10} {'Размер, МБ':>11}")
+    for name, exporter in exporters.items():
+        elapsed, size = await measure(exporter, rows)
+        print(f"{name:8} {elapsed:9.1f} {rows / elapsed:10.0f} {size / 2 ** 20:11.1f}")
+
+    # Пиковая память рабочих процессов выгрузки (ru_maxrss в Linux - в КБ)
+    print(f"Пиковая память рабочего процесса: {resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // 1024} МБ")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000, help="количество выгружаемых записей")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        asyncio.run(main(args.rows))
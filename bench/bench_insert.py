@@ -0,0 +1,78 @@
+"""Сравнение скорости сохранения записей о погоде по одной (add_weather_data) и пакетом (add_weather_data_many).
+
+Запуск из корня проекта (база данных SQLite создается во временном каталоге):
+
+    python -m bench.bench_insert
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from src.DB_manager import DBManager
+from tests.conftest import make_weather_data
+
+
+async def measure(db_url: str, rows: int, batch: bool) -> float:
+    """Асинхронно сохраняет записи в новую базу данных и возвращает скорость сохранения (записей/с).
+
+    Args:
+        db_url (str): url новой базы данных.
+        rows (int): количество записей.
+        batch (bool): сохранять одним пакетом, иначе по одной записи.
+
+    Returns:
+        float: количество записей в секунду.
+    """
+
+    db_manager = DBManager(db_url)
+    await db_manager.init_db()
+    weather_data = [make_weather_data(index) for index in range(rows)]
+
+    started_at = time.perf_counter()
+    if batch:
+        await db_manager.add_weather_data_many(weather_data)
+    else:
+        for item in weather_data:
+            await db_manager.add_weather_data(item)
+    elapsed = time.perf_counter() - started_at
+
+    await db_manager.engine.dispose()
+
+    return rows / elapsed
+
+
+async def main(sizes: list[int], max_single_rows: int) -> None:
+    """Асинхронно сравнивает способы сохранения для разного количества записей.
+
+    Args:
+        sizes (list[int]): количества записей.
+        max_single_rows (int): наибольшее количество записей, сохраняемых по одной.
+    """
+
+    print(f"{'Записей':>8} {'По одной, записей/с':>20} {'Пакетом, записей/с':>19}")
+    with tempfile.TemporaryDirectory() as directory:
+        for number, rows in enumerate(sizes):
+            results = []
+            for batch in (False, True):
+                if not batch and rows > max_single_rows:
+                    results.append("-")
+                    continue
+
+                db_url = f"sqlite+aiosqlite:///{Path(directory) / f'insert_{number}_{batch}.db'}"
+                results.append(f"{await measure(db_url, rows, batch):.0f}")
+
+            print(f"{rows:8} {results[0]:>20} {results[1]:>19}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="количества записей")
+    parser.add_argument(
+        "--max-single-rows", type=int, default=10000, help="наибольшее количество записей, сохраняемых по одной"
+    )
+    args = parser.parse_args()
+
+    asyncio.run(main(args.sizes, args.max_single_rows))
@@ -0,0 +1,87 @@
+"""Сравнение способов чтения записей о погоде по времени и пиковой памяти.
+
+Прежнее чтение ORM-объектами WeatherDataModel со словарями to_dict сравнивается с компактными записями WeatherRow,
+словарями и потоковым чтением пакетами. Запуск из корня проекта (база данных SQLite создается во временном каталоге):
+
+    python -m bench.bench_read --rows 100000
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from sqlalchemy import select
+
+from src.DB_manager import DBManager, WeatherDataModel
+from tests.conftest import make_weather_data
+
+
+async def load_orm_objects(db_manager: DBManager) -> int:
+    """Асинхронно загружает все записи прежним способом get_all_weather_data: ORM-объектами, преобразуемыми
+    в словари методом to_dict, и возвращает их количество.
+    """
+
+    async with db_manager.AsyncSession() as session:
+        result = await session.execute(select(WeatherDataModel))
+        weather_data = [item["WeatherDataModel"].to_dict() for item in result.mappings().all()]
+
+    return len(weather_data)
+
+
+async def load_weather_rows(db_manager: DBManager) -> int:
+    """Асинхронно загружает все записи кортежами WeatherRow и возвращает их количество."""
+
+    return len(await db_manager.get_weather_rows())
+
+
+async def load_weather_data(db_manager: DBManager) -> int:
+    """Асинхронно загружает все записи словарями и возвращает их количество."""
+
+    return len(await db_manager.get_weather_data())
+
+
+async def stream_weather_rows(db_manager: DBManager) -> int:
+    """Асинхронно читает все записи пакетами WeatherRow и возвращает их количество."""
+
+    count = 0
+    async for rows in db_manager.iter_weather_rows():
+        count += len(rows)
+
+    return count
+
+
+async def main(rows: int) -> None:
+    """Асинхронно заполняет базу данных и сравнивает способы чтения.
+
+    Args:
+        rows (int): количество записей.
+    """
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_manager = DBManager(f"sqlite+aiosqlite:///{Path(directory) / 'read.db'}")
+        await db_manager.init_db()
+        await db_manager.add_weather_data_many([make_weather_data(index) for index in range(rows)])
+
+        print(f"{'Способ':22} {'Записей':>8} {'Время, мс':>10} {'Память, МБ':>11}")
+        for load in (load_orm_objects, load_weather_rows, load_weather_data, stream_weather_rows):
+            tracemalloc.start()
+            started_at = time.perf_counter()
+            count = await load(db_manager)
+            elapsed = time.perf_counter() - started_at
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print(f"{load.__name__:22} {count:8} {elapsed * 1000:10.0f} {peak / 2 ** 20:11.1f}")
+
+        await db_manager.engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="количество записей")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rows))
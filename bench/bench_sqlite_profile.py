@@ -0,0 +1,83 @@
+"""Сравнение профилей настроек SQLite (DBManager.SQLITE_PROFILES) на записи и чтении.
+
+Запуск из корня проекта (базы данных создаются во временном каталоге):
+
+    python -m bench.bench_sqlite_profile
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from src.DB_manager import DBManager
+from tests.conftest import make_weather_data
+
+
+async def measure(db_url: str, profile: str, single_rows: int, batches: int, batch_size: int) -> list[float]:
+    """Асинхронно измеряет скорость записи по одной, записи пакетами и полного чтения (записей/с).
+
+    Args:
+        db_url (str): url новой базы данных SQLite.
+        profile (str): профиль настроек из DBManager.SQLITE_PROFILES.
+        single_rows (int): количество записей, сохраняемых по одной.
+        batches (int): количество пакетов.
+        batch_size (int): количество записей в пакете.
+
+    Returns:
+        list[float]: скорости записи по одной, записи пакетами и чтения.
+    """
+
+    db_manager = DBManager(db_url, sqlite_profile=profile)
+    await db_manager.init_db()
+    results = []
+
+    started_at = time.perf_counter()
+    for index in range(single_rows):
+        await db_manager.add_weather_data(make_weather_data(index))
+    results.append(single_rows / (time.perf_counter() - started_at))
+
+    weather_data = [make_weather_data(index) for index in range(single_rows, single_rows + batches * batch_size)]
+    started_at = time.perf_counter()
+    for start in range(0, len(weather_data), batch_size):
+        await db_manager.add_weather_data_many(weather_data[start:start + batch_size])
+    results.append(len(weather_data) / (time.perf_counter() - started_at))
+
+    started_at = time.perf_counter()
+    rows = len(await db_manager.get_weather_rows())
+    results.append(rows / (time.perf_counter() - started_at))
+
+    await db_manager.engine.dispose()
+
+    return results
+
+
+async def main(single_rows: int, batches: int, batch_size: int, repeats: int) -> None:
+    """Асинхронно сравнивает профили, чередуя их, чтобы сгладить влияние кэша файловой системы.
+
+    Args:
+        single_rows (int): количество записей, сохраняемых по одной.
+        batches (int): количество пакетов.
+        batch_size (int): количество записей в пакете.
+        repeats (int): количество повторов для каждого профиля.
+    """
+
+    print(f"{'Профиль':12} {'По одной, записей/с':>20} {'Пакетами, записей/с':>20} {'Чтение, записей/с':>18}")
+    with tempfile.TemporaryDirectory() as directory:
+        for repeat in range(repeats):
+            for profile in DBManager.SQLITE_PROFILES:
+                db_url = f"sqlite+aiosqlite:///{Path(directory) / f'{profile}_{repeat}.db'}"
+                single, batch, read = await measure(db_url, profile, single_rows, batches, batch_size)
+                print(f"{profile:12} {single:20.0f} {batch:20.0f} {read:18.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--single-rows", type=int, default=2000, help="количество записей, сохраняемых по одной")
+    parser.add_argument("--batches", type=int, default=100, help="количество пакетов")
+    parser.add_argument("--batch-size", type=int, default=1000, help="количество записей в пакете")
+    parser.add_argument("--repeats", type=int, default=2, help="количество повторов для каждого профиля")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.single_rows, args.batches, args.batch_size, args.repeats))
@@ -1,9 +1,26 @@
 import asyncio
 
 from src.API_manager import APIManager
+from src.Archive_manager import ArchiveManager
+from src.Buffer_manager import BufferManager
 from src.DB_manager import DBManager
 from src.Excel_manager import ExcelManager
-from src.utils import fetch_and_store_weather_data, get_data_from_env, menu
+from src.Fleet_manager import FleetManager
+from src.utils import (
+    compact_weather_data,
+    fetch_and_store_fleet_weather_data,
+    fetch_and_store_weather_data,
+    get_api_settings_from_env,
+    get_archive_settings_from_env,
+    get_buffer_settings_from_env,
+    get_data_from_env,
+    get_db_settings_from_env,
+    get_excel_settings_from_env,
+    get_export_settings_from_env,
+    get_fleet_settings_from_env,
+    get_locations_from_file,
+    menu,
+)
 
 
 async def main() -> None:
@@ -13,27 +30,60 @@ async def main() -> None:
     LATITUDE, LONGITUDE, FREQUENCY = get_data_from_env()
     print(LATITUDE, LONGITUDE, FREQUENCY)
     # Инициализия: менеджера API; менеджера БД с инициализацией БД; менеджера для работы с Excel
-    weather_api = APIManager(LATITUDE, LONGITUDE)
+    weather_api = APIManager(LATITUDE, LONGITUDE, **get_api_settings_from_env())
 
-    db_manager = DBManager()
+    db_manager = DBManager(**get_db_settings_from_env())
     await db_manager.init_db()
 
-    excel_manager = ExcelManager()
+    # Буфер отложенной записи: данные о погоде сохраняются в БД пакетами фоновой задачей
+    buffer_manager = BufferManager(db_manager, **get_buffer_settings_from_env())
+    buffer_manager.start()
 
-    print(
-        f"Запуск программы получения данных о погоде по координатам: {LATITUDE}° c.ш. и {LONGITUDE}° в.д.\n",
-        f"Периодичность отправки запросов: {FREQUENCY} c.",
-        sep="",
-    )
+    excel_manager = ExcelManager(**get_excel_settings_from_env())
 
     # Создаем событие для остановки
     stop_event = asyncio.Event()
 
+    # Если задан реестр локаций, опрашиваем все локации параллельно, иначе - одну локацию
+    fleet_settings = get_fleet_settings_from_env()
+    locations_file = fleet_settings.pop("locations_file")
+
+    if locations_file:
+        locations = get_locations_from_file(locations_file)
+        fleet_manager = FleetManager(weather_api, buffer_manager, locations, **fleet_settings)
+        fetch_task = fetch_and_store_fleet_weather_data(fleet_manager, FREQUENCY, stop_event)
+        print(f"Запуск программы получения данных о погоде по {len(locations)} локациям из файла {locations_file}")
+    else:
+        fetch_task = fetch_and_store_weather_data(weather_api, buffer_manager, FREQUENCY, stop_event)
+        print(f"Запуск программы получения данных о погоде по координатам: {LATITUDE}° c.ш. и {LONGITUDE}° в.д.")
+
+    print(f"Периодичность отправки запросов: {FREQUENCY} c.")
+
+    # Если задан каталог архива, давние записи периодически переносятся из БД в файлы Parquet
+    archive_settings = get_archive_settings_from_env()
+    archive_interval = archive_settings.pop("interval")
+    archive_manager = None
+    tasks = [fetch_task]
+
+    if archive_settings["path"]:
+        try:
+            archive_manager = ArchiveManager(db_manager, **archive_settings)
+        except ImportError as e:
+            print(e)
+        else:
+            tasks.append(compact_weather_data(archive_manager, archive_interval, stop_event))
+            print(f"Записи старше {archive_manager.max_age_days} дн. переносятся в архив {archive_manager.path}")
+
     # Параллельный запуск в фоновом режиме функций для запроса и сохранения данных в БД и фунции управления приложением
-    await asyncio.gather(
-        fetch_and_store_weather_data(weather_api, db_manager, FREQUENCY, stop_event),
-        menu(db_manager, excel_manager, stop_event),
-    )
+    try:
+        await asyncio.gather(
+            *tasks,
+            menu(db_manager, excel_manager, stop_event, archive_manager, **get_export_settings_from_env()),
+        )
+    finally:
+        # Дожидаемся записи всех данных из буфера и закрываем пул HTTP-соединений
+        await buffer_manager.close()
+        await weather_api.aclose()
 
 
 if __name__ == "__main__":
@@ -1,8 +1,79 @@
-from datetime import datetime
+import importlib.util
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote
 
 import httpx
 
 
+class FreshnessCache:
+    """Кэш ответов API, хранящий данные до ожидаемого следующего обновления "current" значений Open-Meteo."""
+
+    def __init__(self, precision: int = 4) -> None:
+        """Инициализация кэша.
+
+        Args:
+            precision (int): количество знаков после запятой, до которого округляются координаты ключа.
+        """
+
+        self.precision = precision
+        self.entries = {}
+
+    def get_key(self, latitude: float, longitude: float) -> tuple[float, float]:
+        """Формирует ключ кэша из округленных координат.
+
+        Args:
+            latitude (float): широта.
+            longitude (float): долгота.
+
+        Returns:
+            tuple[float, float]: ключ кэша.
+        """
+
+        return round(latitude, self.precision), round(longitude, self.precision)
+
+    def get(self, latitude: float, longitude: float) -> dict | None:
+        """Возвращает данные из кэша, если следующее обновление данных в API еще не наступило.
+
+        Args:
+            latitude (float): широта.
+            longitude (float): долгота.
+
+        Returns:
+            dict | None: данные о погоде или None, если данных нет или они устарели.
+        """
+
+        entry = self.entries.get(self.get_key(latitude, longitude))
+        if entry is None or entry[0] <= time.time():
+            return None
+
+        return entry[1]
+
+    def set(self, latitude: float, longitude: float, data: dict, response: dict) -> bool:
+        """Сохраняет данные в кэш до ожидаемого следующего обновления данных в API.
+
+        Время следующего обновления вычисляется как current.time + current.interval с учетом смещения часового пояса.
+
+        Args:
+            latitude (float): широта.
+            longitude (float): долгота.
+            data (dict): преобразованные данные о погоде.
+            response (dict): ответ API для этих координат.
+
+        Returns:
+            bool: True, если данные содержат новое измерение, False, если измерение уже было в кэше.
+        """
+
+        key = self.get_key(latitude, longitude)
+        previous = self.entries.get(key)
+
+        measured_at = datetime.fromisoformat(response["current"]["time"]).replace(tzinfo=timezone.utc)
+        expires_at = measured_at.timestamp() - response["utc_offset_seconds"] + response["current"]["interval"]
+        self.entries[key] = (expires_at, data)
+
+        return previous is None or previous[1]["datetime_weather"] != data["datetime_weather"]
+
+
 class APIManager:
     """Класс для получения данных с API Open-Meteo."""
 
@@ -16,13 +87,33 @@ class APIManager:
         "wind_speed_10m",
         "wind_direction_10m",
     ]
-
-    def __init__(self, latitude: float, longitude: float) -> None:
+    MAX_URL_LENGTH = 8000  # Максимальная длина URL запроса при пакетном опросе нескольких координат
+
+    def __init__(
+        self,
+        latitude: float,
+        longitude: float,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        timeout: float = 10.0,
+        use_cache: bool = True,
+    ) -> None:
         """Инициализирует объект для работы с API Open-Meteo, формирует координаты и параметры для запроса.
 
+        Создает один долгоживущий HTTP-клиент с пулом соединений, который переиспользуется между запросами,
+        чтобы не выполнять DNS-запрос и TCP/TLS-рукопожатие при каждом опросе.
+
         Args:
             latitude (float): широта.
             longitude (float): долгота.
+            max_connections (int): максимальное количество одновременных соединений.
+            max_keepalive_connections (int): максимальное количество простаивающих соединений в пуле.
+            keepalive_expiry (float): время жизни простаивающего соединения (с).
+            http2 (bool): использовать HTTP/2 (требуется пакет h2).
+            timeout (float): таймаут запроса (с).
+            use_cache (bool): не запрашивать данные повторно до следующего обновления "current" значений в API.
         """
 
         self.latitude = latitude
@@ -30,6 +121,36 @@ class APIManager:
         self.coordinates = {"latitude": self.latitude, "longitude": self.longitude}
         self.params = {"current": self.CURRENT_PARAMETERS}
 
+        if http2 and importlib.util.find_spec("h2") is None:
+            print("Пакет h2 не установлен, используется HTTP/1.1.")
+            http2 = False
+
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            http2=http2,
+            timeout=timeout,
+        )
+        self.cache = FreshnessCache() if use_cache else None
+
+    async def __aenter__(self) -> "APIManager":
+        """Позволяет использовать менеджер в конструкции async with."""
+
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        """Закрывает HTTP-клиент при выходе из конструкции async with."""
+
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Асинхронно закрывает HTTP-клиент и все соединения пула."""
+
+        await self.client.aclose()
+
     async def get_response_from_openmeteo(self) -> list[object]:
         """Асинхронно отправляет запрос к API Open-Meteo с заданными координатами и параметрами, возвращает ответ.
 
@@ -39,11 +160,132 @@ class APIManager:
 
         params = {**self.coordinates, **self.params}
 
-        async with httpx.AsyncClient() as client:
+        try:
+            response = await self.client.get(self.URL, params=params)
+            response.raise_for_status()
+            return response.json()
+
+        except httpx.RequestError as e:
+            print(f"Ошибка запроса: {e}")
+        except httpx.HTTPStatusError as e:
+            print(f"Ошибка HTTP: {e.response.status_code} - {e.response.text}")
+        except Exception as e:
+            print(f"Неизвестная ошибка: {e}")
+
+    def chunk_coordinates(self, coordinates: list[tuple[float, float]]) -> list[list[tuple[float, float]]]:
+        """Разбивает список координат на части так, чтобы URL каждого запроса не превышал MAX_URL_LENGTH.
+
+        Args:
+            coordinates (list[tuple[float, float]]): список пар (широта, долгота).
+
+        Returns:
+            list[list[tuple[float, float]]]: список частей со списками координат.
+        """
+
+        base_length = len(str(httpx.URL(self.URL, params=self.params))) + len("&latitude=&longitude=")
+        separator_length = len(quote(","))
+
+        chunks = []
+        chunk = []
+        length = base_length
+
+        for latitude, longitude in coordinates:
+            coordinate_length = len(str(latitude)) + len(str(longitude)) + 2 * separator_length
+            if chunk and length + coordinate_length > self.MAX_URL_LENGTH:
+                chunks.append(chunk)
+                chunk = []
+                length = base_length
+            chunk.append((latitude, longitude))
+            length += coordinate_length
+
+        if chunk:
+            chunks.append(chunk)
+
+        return chunks
+
+    def filter_stale_coordinates(self, coordinates: list[tuple[float, float]]) -> list[tuple[float, float]]:
+        """Отбирает координаты, данные для которых отсутствуют в кэше или устарели.
+
+        Args:
+            coordinates (list[tuple[float, float]]): список пар (широта, долгота).
+
+        Returns:
+            list[tuple[float, float]]: координаты, для которых нужно отправить запрос.
+        """
+
+        if self.cache is None:
+            return coordinates
+
+        return [
+            (latitude, longitude) for latitude, longitude in coordinates if self.cache.get(latitude, longitude) is None
+        ]
+
+    async def get_weather_data_chunk(
+        self, coordinates: list[tuple[float, float]], only_new: bool = False
+    ) -> list[dict]:
+        """Асинхронно получает данные о погоде для нескольких координат одним запросом к API Open-Meteo.
+
+        В отличие от get_weather_data ошибки запроса не перехватываются, а передаются вызывающему коду.
+
+        Args:
+            coordinates (list[tuple[float, float]]): список пар (широта, долгота), помещающийся в один запрос.
+            only_new (bool): возвращать только новые измерения, отсутствующие в кэше.
+
+        Returns:
+            list[dict]: список словарей с погодными данными в порядке переданных координат.
+        """
+
+        params = {
+            "latitude": ",".join(str(latitude) for latitude, _ in coordinates),
+            "longitude": ",".join(str(longitude) for _, longitude in coordinates),
+            **self.params,
+        }
+
+        response = await self.client.get(self.URL, params=params)
+        response.raise_for_status()
+        results = response.json()
+
+        # Для одной пары координат API возвращает объект, а не список
+        if isinstance(results, dict):
+            results = [results]
+
+        data = []
+
+        for (latitude, longitude), result in zip(coordinates, results):
+            item = self.convert_data(result, latitude, longitude)
+            is_new = self.cache is None or self.cache.set(latitude, longitude, item, result)
+            if is_new or not only_new:
+                data.append(item)
+
+        return data
+
+    async def get_weather_data_many(self, coordinates: list[tuple[float, float]], only_new: bool = False) -> list[dict]:
+        """Асинхронно получает данные о погоде для списка координат, отправляя один запрос на каждую часть списка.
+
+        Запросы отправляются только для координат, данные которых отсутствуют в кэше или устарели.
+
+        Args:
+            coordinates (list[tuple[float, float]]): список пар (широта, долгота).
+            only_new (bool): возвращать только новые измерения, без данных из кэша.
+
+        Returns:
+            list[dict]: список словарей с погодными данными для успешно обработанных координат.
+        """
+
+        data = []
+        stale_coordinates = self.filter_stale_coordinates(coordinates)
+
+        if not only_new and self.cache is not None:
+            stale = set(stale_coordinates)
+            data.extend(
+                self.cache.get(latitude, longitude)
+                for latitude, longitude in coordinates
+                if (latitude, longitude) not in stale
+            )
+
+        for chunk in self.chunk_coordinates(stale_coordinates):
             try:
-                response = await client.get(self.URL, params=params)
-                response.raise_for_status()
-                return response.json()
+                data.extend(await self.get_weather_data_chunk(chunk, only_new))
 
             except httpx.RequestError as e:
                 print(f"Ошибка запроса: {e}")
@@ -52,11 +294,15 @@ class APIManager:
             except Exception as e:
                 print(f"Неизвестная ошибка: {e}")
 
-    def convert_data(self, response: list[object]) -> dict:
+        return data
+
+    def convert_data(self, response: list[object], latitude: float = None, longitude: float = None) -> dict:
         """Преобразует данные, полученные из объекта response, и формирует словарь с характеристиками текущей погоды.
 
         Args:
             response (list[object]): список объектов, содержащих данные о погоде.
+            latitude (float): широта (по умолчанию широта менеджера).
+            longitude (float): долгота (по умолчанию долгота менеджера).
 
         Returns:
             dict: словарь с характеристиками погоды.
@@ -64,8 +310,8 @@ class APIManager:
 
         data = {}
 
-        data["latitude"] = self.latitude  # Широта
-        data["longitude"] = self.longitude  # Долгота
+        data["latitude"] = self.latitude if latitude is None else latitude  # Широта
+        data["longitude"] = self.longitude if longitude is None else longitude  # Долгота
         data["timezone"] = response["timezone"]  # Часовой пояс
         data["utc_offset_seconds"] = response["utc_offset_seconds"]  # Смещение часового пояса
         data["datetime_request"] = datetime.now()  # Время и дата запроса данных
@@ -88,19 +334,34 @@ class APIManager:
         data["wind_direction_10m"] = self.convert_degrees_to_direction(
             response["current"]["wind_direction_10m"]
         )  # Направление ветра
+        data["wind_direction_degrees"] = response["current"]["wind_direction_10m"]  # Направление ветра (градусы)
 
         return data
 
-    async def get_weather_data(self) -> dict:
+    async def get_weather_data(self, only_new: bool = False) -> dict | None:
         """Асинхронно получает данные о погоде из API Open-Meteo и преобразует их в удобный формат.
 
+        Пока не наступило ожидаемое обновление данных в API, данные возвращаются из кэша без запроса.
+
+        Args:
+            only_new (bool): возвращать None вместо данных, которые уже были получены ранее.
+
         Returns:
-            dict: словарь с текущими погодными данными, преобразованными в удобный формат.
+            dict | None: словарь с текущими погодными данными, преобразованными в удобный формат.
         """
 
+        if self.cache is not None:
+            cached = self.cache.get(self.latitude, self.longitude)
+            if cached is not None:
+                return None if only_new else cached
+
         response = await self.get_response_from_openmeteo()
+        data = self.convert_data(response)
+
+        if self.cache is not None and not self.cache.set(self.latitude, self.longitude, data, response) and only_new:
+            return None
 
-        return self.convert_data(response)
+        return data
 
     @staticmethod
     def determine_type_precipitation(precipitation_rain: float, precipitation_snow: float) -> str:
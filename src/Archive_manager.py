@@ -0,0 +1,204 @@
+import asyncio
+import functools
+import operator
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from .DB_manager import DBManager, WeatherRow, datetime_to_epoch, epoch_to_datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:  # Архив Parquet доступен только при установленном пакете pyarrow
+    pa = ds = None
+
+
+# Схема записей архива (поля WeatherRow) и ключи секций: локация и месяц измерения (ГГГГММ по UTC)
+if pa is not None:
+    ARCHIVE_SCHEMA = pa.schema(
+        [
+            ("id", pa.int64()),
+            ("latitude", pa.float64()),
+            ("longitude", pa.float64()),
+            ("timezone", pa.string()),
+            ("utc_offset_seconds", pa.int32()),
+            ("datetime_request", pa.int64()),
+            ("datetime_weather", pa.int64()),
+            ("temperature_2m", pa.float64()),
+            ("precipitation", pa.float64()),
+            ("type_precipitation", pa.string()),
+            ("pressure_msl", pa.float64()),
+            ("wind_speed_10m", pa.float64()),
+            ("wind_direction_10m", pa.string()),
+            ("wind_direction_degrees", pa.float64()),
+            ("valid_to", pa.int64()),
+            ("poll_count", pa.int32()),
+            ("month", pa.int32()),
+        ]
+    )
+    ARCHIVE_PARTITIONING = ds.partitioning(
+        pa.schema([("latitude", pa.float64()), ("longitude", pa.float64()), ("month", pa.int32())]), flavor="hive"
+    )
+
+
+def get_month(epoch: int) -> int:
+    """Возвращает месяц измерения для ключа секции архива.
+
+    Args:
+        epoch (int): Unix-время измерения.
+
+    Returns:
+        int: месяц в виде числа ГГГГММ (по UTC).
+    """
+
+    moment = epoch_to_datetime(epoch, 0)
+
+    return moment.year * 100 + moment.month
+
+
+class ArchiveManager:
+    """Класс-менеджер архива давних записей о погоде в файлах Parquet.
+
+    Записи старше max_age_days дней переносятся из базы данных в каталог архива с секциями
+    latitude=.../longitude=.../month=ГГГГММ. Чтение объединяет архив с базой данных и читает только нужные столбцы.
+    """
+
+    def __init__(
+        self, db_manager: DBManager, path: str = "archive", max_age_days: int = 90, batch_size: int = 100000
+    ) -> None:
+        """Инициализация менеджера архива.
+
+        Args:
+            db_manager (DBManager): менеджер базы данных.
+            path (str): каталог архива.
+            max_age_days (int): возраст записей (дней), после которого они переносятся в архив.
+            batch_size (int): количество записей, записываемых в архив за один раз.
+        """
+
+        if pa is None:
+            raise ImportError("Для архива Parquet требуется пакет pyarrow: pip install pyarrow")
+
+        self.db_manager = db_manager
+        self.path = Path(path)
+        self.max_age_days = max_age_days
+        self.batch_size = batch_size
+
+    async def compact(self, now: datetime | None = None) -> int:
+        """Асинхронно переносит записи старше max_age_days дней из базы данных в архив.
+
+        Записи удаляются из базы данных только после записи всех файлов архива. Агрегаты сохраняются: граница
+        переноса округляется до начала суток (UTC), поэтому интервалы агрегатов не делятся между архивом и базой данных.
+
+        Args:
+            now (datetime | None): текущий момент (без часового пояса - UTC, по умолчанию текущее время).
+
+        Returns:
+            int: количество перенесенных записей.
+        """
+
+        if now is None:
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+        before = (now - timedelta(days=self.max_age_days)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+        # Измерения интервалов, продолжающихся после границы, остаются в базе данных
+        await self.db_manager.split_observation_spans(before)
+
+        moved = 0
+        async for batch in self.db_manager.iter_weather_rows(self.batch_size, until=before):
+            await asyncio.to_thread(self.write_batch, batch)
+            moved += len(batch)
+
+        if moved:
+            await self.db_manager.delete_weather_data_before(before)
+
+        return moved
+
+    def write_batch(self, rows: list[WeatherRow]) -> None:
+        """Записывает пакет записей в файлы архива по секциям локаций и месяцев.
+
+        Args:
+            rows (list[WeatherRow]): записи о погоде.
+        """
+
+        columns = dict(zip(WeatherRow._fields, map(list, zip(*rows))))
+        columns["month"] = [get_month(epoch) for epoch in columns["datetime_weather"]]
+
+        ds.write_dataset(
+            pa.table(columns, schema=ARCHIVE_SCHEMA),
+            self.path,
+            format="parquet",
+            partitioning=ARCHIVE_PARTITIONING,
+            # Имена файлов уникальны для каждого пакета, поэтому повторный перенос дополняет секции
+            basename_template=f"part-{rows[0].id}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+
+    async def read(
+        self,
+        columns: list[str] | None = None,
+        location: tuple[float, float] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+    ) -> "pa.Table":
+        """Асинхронно читает записи о погоде из архива и базы данных одной таблицей Arrow.
+
+        Из архива читаются только выбранные столбцы; фильтры по локации и месяцу отсекают каталоги секций,
+        фильтр по времени измерения - группы строк файлов по их статистике. Из базы данных выбираются
+        только те же столбцы с теми же фильтрами.
+
+        Args:
+            columns (list[str] | None): поля WeatherRow (по умолчанию все).
+            location (tuple[float, float] | None): локация в виде пары (широта, долгота).
+            since (datetime | None): начало периода измерения (включительно, без часового пояса - UTC).
+            until (datetime | None): конец периода измерения (не включительно, без часового пояса - UTC).
+
+        Returns:
+            pa.Table: записи архива, а за ними записи базы данных (дата и время в Unix-времени).
+        """
+
+        columns = list(columns or WeatherRow._fields)
+        schema = pa.schema([ARCHIVE_SCHEMA.field(name) for name in columns])
+
+        cold = await asyncio.to_thread(self.read_archive, columns, location, since, until)
+        hot = await self.db_manager.get_weather_columns(columns, location, since, until)
+
+        return pa.concat_tables([cold.cast(schema), pa.table(hot, schema=schema)])
+
+    def read_archive(
+        self,
+        columns: list[str],
+        location: tuple[float, float] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+    ) -> "pa.Table":
+        """Читает выбранные столбцы записей архива с фильтрами по локации и периоду измерения.
+
+        Args:
+            columns (list[str]): поля WeatherRow.
+            location (tuple[float, float] | None): локация в виде пары (широта, долгота).
+            since (datetime | None): начало периода измерения (включительно).
+            until (datetime | None): конец периода измерения (не включительно).
+
+        Returns:
+            pa.Table: записи архива.
+        """
+
+        if not self.path.is_dir():
+            return pa.schema([ARCHIVE_SCHEMA.field(name) for name in columns]).empty_table()
+
+        conditions = []
+        if location is not None:
+            latitude, longitude = location
+            conditions += [ds.field("latitude") == latitude, ds.field("longitude") == longitude]
+        if since is not None:
+            since_epoch = datetime_to_epoch(since, 0)
+            conditions += [ds.field("month") >= get_month(since_epoch), ds.field("datetime_weather") >= since_epoch]
+        if until is not None:
+            until_epoch = datetime_to_epoch(until, 0)
+            conditions += [ds.field("month") <= get_month(until_epoch - 1), ds.field("datetime_weather") < until_epoch]
+
+        dataset = ds.dataset(self.path, schema=ARCHIVE_SCHEMA, format="parquet", partitioning=ARCHIVE_PARTITIONING)
+
+        return dataset.to_table(
+            columns=columns, filter=functools.reduce(operator.and_, conditions) if conditions else None
+        )
@@ -0,0 +1,121 @@
+import asyncio
+
+from .DB_manager import DBManager
+
+
+class BufferManager:
+    """Класс-менеджер буфера отложенной записи данных о погоде в базу данных.
+
+    Данные накапливаются в ограниченной очереди и записываются фоновой задачей пакетами, когда набирается
+    max_rows записей или проходит flush_interval_ms миллисекунд с момента поступления первой записи пакета.
+    """
+
+    def __init__(
+        self, db_manager: DBManager, max_rows: int = 500, flush_interval_ms: int = 1000, max_queue: int = 10000
+    ) -> None:
+        """Инициализация буфера.
+
+        Args:
+            db_manager (DBManager): менеджер базы данных.
+            max_rows (int): максимальное количество записей в одном пакете.
+            flush_interval_ms (int): максимальное время ожидания пакета (мс).
+            max_queue (int): максимальный размер очереди, при заполнении которой запись в буфер ожидает.
+        """
+
+        self.db_manager = db_manager
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval_ms / 1000
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.task = None
+
+    def start(self) -> None:
+        """Запускает фоновую задачу записи данных в базу данных."""
+
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def close(self) -> None:
+        """Асинхронно дожидается записи всех данных из очереди и останавливает фоновую задачу."""
+
+        if self.task is None:
+            return
+
+        # Пустое значение - признак завершения, оно встает в очередь после всех данных
+        await self.queue.put(None)
+        await self.task
+        self.task = None
+
+    async def add_weather_data(self, weather_data: dict) -> None:
+        """Асинхронно добавляет запись о погоде в очередь на запись, ожидая при заполненной очереди.
+
+        Args:
+            weather_data (dict): словарь с данными о погоде.
+        """
+
+        await self.queue.put(weather_data)
+
+    async def add_weather_data_many(self, weather_data: list[dict]) -> None:
+        """Асинхронно добавляет несколько записей о погоде в очередь на запись.
+
+        Args:
+            weather_data (list[dict]): список словарей с данными о погоде.
+        """
+
+        for item in weather_data:
+            await self.queue.put(item)
+
+    async def run(self) -> None:
+        """Асинхронно записывает данные из очереди в базу данных пакетами до получения признака завершения."""
+
+        loop = asyncio.get_running_loop()
+        closing = False
+
+        while not closing:
+            item = await self.queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.max_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+
+            await self.flush(batch)
+
+    async def flush(self, batch: list[dict]) -> None:
+        """Асинхронно записывает пакет данных в базу данных.
+
+        Пакет записывается одной транзакцией, и ошибка в одной записи отменяет весь пакет, поэтому при ошибке записи
+        пакета записи сохраняются по одной: теряются только записи, которые не удалось сохранить.
+
+        Args:
+            batch (list[dict]): список словарей с данными о погоде.
+        """
+
+        try:
+            await self.db_manager.add_weather_data_many(batch)
+            return
+        except Exception as e:
+            print(f"Ошибка при сохранении {len(batch)} записей в базу данных, записи сохраняются по одной: {e}")
+
+        for item in batch:
+            try:
+                await self.db_manager.add_weather_data(item)
+            except Exception as e:
+                print(
+                    f"Ошибка при сохранении записи о погоде ({item.get('latitude')}, {item.get('longitude')}) "
+                    f"за {item.get('datetime_weather')} в базу данных: {e}"
+                )
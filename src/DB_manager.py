@@ -1,11 +1,106 @@
-from sqlalchemy import Column, DateTime, Float, Integer, String, select, text
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Connection,
+    FromClause,
+    Float,
+    ForeignKey,
+    Index,
+    Insert,
+    Integer,
+    MetaData,
+    PrimaryKeyConstraint,
+    Select,
+    SmallInteger,
+    String,
+    Table,
+    UniqueConstraint,
+    case,
+    delete,
+    event,
+    func,
+    insert,
+    inspect,
+    make_url,
+    select,
+    tuple_,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import declared_attr, relationship, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.schema import CreateIndex, CreateTable
 
 
 Base = declarative_base()
 
+# Значения категориальных признаков, в базе данных хранится номер значения в кортеже
+PRECIPITATION_TYPES = ("отсутствуют", "дождь", "снег", "дождь и снег")
+WIND_DIRECTIONS = ("С", "СВ", "В", "ЮВ", "Ю", "ЮЗ", "З", "СЗ")
+
+PRECIPITATION_TYPE_CODES = {name: code for code, name in enumerate(PRECIPITATION_TYPES)}
+WIND_DIRECTION_CODES = {name: code for code, name in enumerate(WIND_DIRECTIONS)}
+
+
+EPOCH = datetime(1970, 1, 1)  # Начало отсчета Unix-времени (UTC)
+
+
+def datetime_to_epoch(value: datetime, utc_offset_seconds: int | None = None) -> int:
+    """Преобразует дату и время в Unix-время (секунды).
+
+    Args:
+        value (datetime): дата и время.
+        utc_offset_seconds (int | None): смещение часового пояса для даты и времени без часового пояса
+            (None - локальное время компьютера).
+
+    Returns:
+        int: Unix-время.
+    """
+
+    if value.tzinfo is None and utc_offset_seconds is not None:
+        value = value.replace(tzinfo=timezone(timedelta(seconds=utc_offset_seconds)))
+
+    return int(value.timestamp())
+
+
+def epoch_to_datetime(value: int, utc_offset_seconds: int | None = None) -> datetime:
+    """Преобразует Unix-время (секунды) в дату и время без часового пояса.
+
+    Args:
+        value (int): Unix-время.
+        utc_offset_seconds (int | None): смещение часового пояса результата (None - локальное время компьютера).
+
+    Returns:
+        datetime: дата и время.
+    """
+
+    if utc_offset_seconds is None:
+        return datetime.fromtimestamp(value)
+
+    return EPOCH + timedelta(seconds=value + utc_offset_seconds)
+
+
+class LocationModel(Base):
+    """Модель для хранения локаций, по которым запрашиваются данные о погоде."""
+
+    __tablename__ = "locations"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    latitude = Column(Float, nullable=False)  # Широта
+    longitude = Column(Float, nullable=False)  # Долгота
+    timezone = Column(String, nullable=False)  # Часовой пояс
+
+    __table_args__ = (UniqueConstraint("latitude", "longitude", name="uq_locations_coordinates"),)
+
 
 class WeatherDataModel(Base):
     """Модель для хранения данных о погоде."""
@@ -13,20 +108,35 @@ class WeatherDataModel(Base):
     __tablename__ = "weather_data"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    latitude = Column(Float, nullable=False)  # Широта
-    longitude = Column(Float, nullable=False)  # Долгота
+    location_id = Column(Integer, ForeignKey("locations.id"), nullable=False)  # Локация
 
-    timezone = Column(String, nullable=False)  # Часовой пояс
     utc_offset_seconds = Column(Integer, nullable=False)  # Смещение часового пояса
-    datetime_request = Column(DateTime, nullable=False)  # Дата и время запроса данных
-    datetime_weather = Column(DateTime, nullable=False)  # Дата и время измерения погоды
+    datetime_request = Column(BigInteger, nullable=False)  # Дата и время запроса данных (Unix-время, с)
+    datetime_weather = Column(BigInteger, nullable=False)  # Дата и время измерения погоды (Unix-время, с)
 
     temperature_2m = Column(Float, nullable=False)  # Температура воздуха (°C)
     precipitation = Column(Float, nullable=False)  # Количество осадков (мм)
-    type_precipitation = Column(String, nullable=False)  # Тип осадков (дождь, снег, дождь и снег, отсутствует)
+    type_precipitation = Column(SmallInteger, nullable=False)  # Код типа осадков (номер в PRECIPITATION_TYPES)
     pressure_msl = Column(Float, nullable=False)  # Атмосферное давление на уровне моря (мм рт.ст.)
     wind_speed_10m = Column(Float, nullable=False)  # Скорость ветра на высоте 10 метров (м/с)
-    wind_direction_10m = Column(String, nullable=False)  # Направление ветра на высоте 10 метров
+    wind_direction_10m = Column(SmallInteger, nullable=False)  # Код направления ветра (номер в WIND_DIRECTIONS)
+    wind_direction_degrees = Column(Float)  # Направление ветра в градусах (неизвестно для перенесенных записей)
+
+    # Интервал неизменных значений: datetime_weather - первое измерение, valid_to - последнее измерение
+    # с теми же значениями (пусто - совпадает с datetime_weather), poll_count - количество таких измерений
+    valid_to = Column(BigInteger)
+    poll_count = Column(Integer, nullable=False, default=1, server_default="1")
+
+    location = relationship(LocationModel, lazy="joined")
+
+    __table_args__ = (
+        # Одно измерение на локацию и момент времени; индекс также обслуживает выборку по локации и периоду
+        Index("uq_weather_data_location_datetime_weather", "location_id", "datetime_weather", unique=True),
+        # Выборка по периоду запроса данных
+        Index("ix_weather_data_datetime_request", "datetime_request"),
+        # Выборка по периоду измерения без локации (выгрузка, перенос в архив, удаление старых записей)
+        Index("ix_weather_data_datetime_weather", "datetime_weather"),
+    )
 
     def to_dict(self) -> dict:
         """Метод преобразующий объекты модели в словарь.
@@ -37,78 +147,2073 @@ class WeatherDataModel(Base):
 
         data = {
             "id": self.id,
-            "latitude": self.latitude,
-            "longitude": self.longitude,
-            "timezone": self.timezone,
+            "latitude": self.location.latitude,
+            "longitude": self.location.longitude,
+            "timezone": self.location.timezone,
             "utc_offset_seconds": self.utc_offset_seconds,
-            "datetime_request": self.datetime_request,
-            "datetime_weather": self.datetime_weather,
+            "datetime_request": epoch_to_datetime(self.datetime_request),
+            "datetime_weather": epoch_to_datetime(self.datetime_weather, self.utc_offset_seconds),
             "temperature_2m": self.temperature_2m,
             "precipitation": self.precipitation,
-            "type_precipitation": self.type_precipitation,
+            "type_precipitation": PRECIPITATION_TYPES[self.type_precipitation],
             "pressure_msl": self.pressure_msl,
             "wind_speed_10m": self.wind_speed_10m,
-            "wind_direction_10m": self.wind_direction_10m,
+            "wind_direction_10m": WIND_DIRECTIONS[self.wind_direction_10m],
+            "wind_direction_degrees": self.wind_direction_degrees,
+            "valid_to": epoch_to_datetime(self.valid_to or self.datetime_weather, self.utc_offset_seconds),
+            "poll_count": self.poll_count,
         }
 
         return data
 
 
+class WeatherDataSequenceModel(Base):
+    """Модель счетчика идентификаторов записей о погоде, общего для всех помесячных секций."""
+
+    __tablename__ = "weather_data_sequence"
+
+    id = Column(Integer, primary_key=True)
+    last_id = Column(Integer, nullable=False)  # Последний выданный идентификатор записи
+
+
+class ExportWatermarkModel(Base):
+    """Модель отметок инкрементальной выгрузки: последний выгруженный идентификатор записи по каждому получателю."""
+
+    __tablename__ = "export_watermarks"
+
+    target = Column(String, primary_key=True)  # Получатель выгрузки (например, "excel")
+    last_id = Column(Integer, nullable=False)  # Идентификатор последней выгруженной записи
+
+
+PARTITION_PREFIX = "weather_data_"  # Префикс имен помесячных секций таблицы weather_data
+
+
+def get_partition_name(epoch: int) -> str:
+    """Возвращает имя помесячной секции для Unix-времени измерения.
+
+    Args:
+        epoch (int): Unix-время измерения.
+
+    Returns:
+        str: имя секции вида weather_data_ГГГГММ (месяц по UTC).
+    """
+
+    moment = epoch_to_datetime(epoch, 0)
+
+    return f"{PARTITION_PREFIX}{moment.year:04d}{moment.month:02d}"
+
+
+def is_partition_name(name: str) -> bool:
+    """Проверяет, является ли таблица помесячной секцией.
+
+    Args:
+        name (str): имя таблицы.
+
+    Returns:
+        bool: True для имени вида weather_data_ГГГГММ.
+    """
+
+    return name.startswith(PARTITION_PREFIX) and name[len(PARTITION_PREFIX):].isdigit()
+
+
+def get_partition_bounds(name: str) -> tuple[int, int]:
+    """Возвращает границы периода помесячной секции.
+
+    Args:
+        name (str): имя секции вида weather_data_ГГГГММ.
+
+    Returns:
+        tuple[int, int]: Unix-время начала (включительно) и конца (не включительно) месяца.
+    """
+
+    year, month = int(name[-6:-2]), int(name[-2:])
+    start = datetime(year, month, 1)
+    end = datetime(year + month // 12, month % 12 + 1, 1)
+
+    return datetime_to_epoch(start, 0), datetime_to_epoch(end, 0)
+
+
+class WeatherRollupMixin:
+    """Столбцы агрегатов данных о погоде по локации за интервал времени."""
+
+    @declared_attr
+    def location_id(cls):
+        """Локация (внешний ключ объявляется отдельно для каждой таблицы агрегатов)."""
+
+        return Column(Integer, ForeignKey("locations.id"), nullable=False)
+
+    bucket = Column(BigInteger, nullable=False)  # Начало интервала (Unix-время, с)
+    observations = Column(Integer, nullable=False)  # Количество измерений
+    temperature_min = Column(Float, nullable=False)  # Минимальная температура воздуха (°C)
+    temperature_max = Column(Float, nullable=False)  # Максимальная температура воздуха (°C)
+    temperature_sum = Column(Float, nullable=False)  # Сумма температур воздуха для расчета средней (°C)
+    precipitation_sum = Column(Float, nullable=False)  # Сумма осадков (мм)
+    wind_speed_sum = Column(Float, nullable=False)  # Сумма скоростей ветра для расчета средней (м/с)
+
+    # Первичный ключ (локация, начало интервала) - для выборки по локации и периоду и для ON CONFLICT
+    __table_args__ = (PrimaryKeyConstraint("location_id", "bucket"),)
+
+
+class WeatherHourlyModel(WeatherRollupMixin, Base):
+    """Модель для хранения почасовых агрегатов данных о погоде."""
+
+    __tablename__ = "weather_rollup_hourly"
+
+
+class WeatherDailyModel(WeatherRollupMixin, Base):
+    """Модель для хранения посуточных агрегатов данных о погоде."""
+
+    __tablename__ = "weather_rollup_daily"
+
+
+# Таблицы агрегатов и длительность их интервалов (с)
+ROLLUPS = {
+    "hour": (WeatherHourlyModel.__table__, 3600),
+    "day": (WeatherDailyModel.__table__, 86400),
+}
+
+# Показатели и функции, доступные для агрегации средствами базы данных
+# Измеряемые значения: в режиме хранения изменений запись продлевается, пока они не меняются
+MEASURED_COLUMNS = (
+    "temperature_2m",
+    "precipitation",
+    "type_precipitation",
+    "pressure_msl",
+    "wind_speed_10m",
+    "wind_direction_10m",
+    "wind_direction_degrees",
+)
+
+# Столбцы Unix-времени в таблицах записей о погоде и агрегатов
+EPOCH_COLUMNS = ("datetime_request", "datetime_weather", "valid_to", "bucket")
+
+# Способы обработки повторно полученного измерения: пропустить или обновить сохраненные значения
+ON_CONFLICT_MODES = ("ignore", "update")
+# Столбцы, не изменяемые при обновлении повторного измерения
+CONFLICT_KEY_COLUMNS = ("id", "location_id", "datetime_weather")
+
+AGGREGATE_METRICS = ("temperature_2m", "precipitation", "pressure_msl", "wind_speed_10m")
+AGGREGATE_FUNCTIONS = {"avg": func.avg, "min": func.min, "max": func.max, "sum": func.sum, "count": func.count}
+# Источники данных статистики: выбор автоматически, записи о погоде, таблицы агрегатов
+AGGREGATE_SOURCES = ("auto", "raw", "rollup")
+
+
+class WeatherRow(NamedTuple):
+    """Компактное представление записи о погоде для чтения без создания ORM-объектов.
+
+    Дата и время хранятся в Unix-времени и преобразуются в datetime только методом to_dict.
+    """
+
+    id: int
+    latitude: float
+    longitude: float
+    timezone: str
+    utc_offset_seconds: int
+    datetime_request: int
+    datetime_weather: int
+    temperature_2m: float
+    precipitation: float
+    type_precipitation: str
+    pressure_msl: float
+    wind_speed_10m: float
+    wind_direction_10m: str
+    wind_direction_degrees: float | None
+    valid_to: int
+    poll_count: int
+
+    def to_dict(self) -> dict:
+        """Преобразует запись в словарь с датой и временем измерения в часовом поясе локации и датой и временем
+        запроса в локальном времени.
+
+        Returns:
+            dict: словарь с данными.
+        """
+
+        data = self._asdict()
+        data["datetime_request"] = epoch_to_datetime(self.datetime_request)
+        data["datetime_weather"] = epoch_to_datetime(self.datetime_weather, self.utc_offset_seconds)
+        data["valid_to"] = epoch_to_datetime(self.valid_to, self.utc_offset_seconds)
+
+        return data
+
+
+def get_poll_times(start: int, end: int, count: int) -> list[int]:
+    """Восстанавливает моменты измерений интервала неизменных значений, распределяя их равномерно.
+
+    Args:
+        start (int): Unix-время первого измерения.
+        end (int): Unix-время последнего измерения.
+        count (int): количество измерений.
+
+    Returns:
+        list[int]: Unix-время каждого измерения.
+    """
+
+    if count <= 1:
+        return [start]
+
+    return [start + round(i * (end - start) / (count - 1)) for i in range(count)]
+
+
+def expand_weather_rows(rows: list[WeatherRow]) -> list[WeatherRow]:
+    """Разворачивает записи режима хранения изменений в ряд отдельных измерений.
+
+    Запись с poll_count измерениями заменяется poll_count записями с теми же значениями, равномерно распределенными
+    от datetime_weather до valid_to; время запроса сдвигается вместе со временем измерения.
+
+    Args:
+        rows (list[WeatherRow]): записи о погоде.
+
+    Returns:
+        list[WeatherRow]: записи об отдельных измерениях.
+    """
+
+    expanded = []
+    for row in rows:
+        if row.poll_count == 1:
+            expanded.append(row)
+            continue
+
+        for moment in get_poll_times(row.datetime_weather, row.valid_to, row.poll_count):
+            shift = moment - row.datetime_weather
+            expanded.append(
+                row._replace(
+                    datetime_request=row.datetime_request + shift,
+                    datetime_weather=moment,
+                    valid_to=moment,
+                    poll_count=1,
+                )
+            )
+
+    return expanded
+
+
+def make_weather_row(row: dict, latitude: float, longitude: float, timezone: str) -> WeatherRow:
+    """Преобразует строку таблицы weather_data в WeatherRow, расшифровывая коды категорий.
+
+    Args:
+        row (dict): значения столбцов таблицы weather_data.
+        latitude (float): широта локации.
+        longitude (float): долгота локации.
+        timezone (str): часовой пояс локации.
+
+    Returns:
+        WeatherRow: запись о погоде.
+    """
+
+    # SQLite возвращает в RETURNING целые значения столбцов REAL как int, а чтение через select - как float
+    degrees = row["wind_direction_degrees"]
+
+    return WeatherRow(
+        row.get("id"),
+        latitude,
+        longitude,
+        timezone,
+        row["utc_offset_seconds"],
+        row["datetime_request"],
+        row["datetime_weather"],
+        float(row["temperature_2m"]),
+        float(row["precipitation"]),
+        PRECIPITATION_TYPES[row["type_precipitation"]],
+        float(row["pressure_msl"]),
+        float(row["wind_speed_10m"]),
+        WIND_DIRECTIONS[row["wind_direction_10m"]],
+        None if degrees is None else float(degrees),
+        row.get("valid_to") or row["datetime_weather"],
+        row.get("poll_count") or 1,
+    )
+
+
+def decode_weather_row(row: tuple) -> WeatherRow:
+    """Преобразует строку результата select_weather_data в WeatherRow, расшифровывая коды категорий.
+
+    Args:
+        row (tuple): строка результата запроса.
+
+    Returns:
+        WeatherRow: запись о погоде.
+    """
+
+    (
+        id,
+        latitude,
+        longitude,
+        timezone,
+        utc_offset_seconds,
+        datetime_request,
+        datetime_weather,
+        temperature_2m,
+        precipitation,
+        type_precipitation,
+        pressure_msl,
+        wind_speed_10m,
+        wind_direction_10m,
+        wind_direction_degrees,
+        valid_to,
+        poll_count,
+    ) = row
+
+    return WeatherRow(
+        id,
+        latitude,
+        longitude,
+        timezone,
+        utc_offset_seconds,
+        datetime_request,
+        datetime_weather,
+        temperature_2m,
+        precipitation,
+        PRECIPITATION_TYPES[type_precipitation],
+        pressure_msl,
+        wind_speed_10m,
+        WIND_DIRECTIONS[wind_direction_10m],
+        wind_direction_degrees,
+        valid_to,
+        poll_count,
+    )
+
+
 class DBManager:
     """Класс-менеджер для работы с базой данных."""
 
-    def __init__(self, db_url="sqlite+aiosqlite:///weather_data.db") -> None:
+    # Профили настроек SQLite, применяемые к каждому новому соединению
+    SQLITE_PROFILES = {
+        "default": {},
+        "performance": {
+            "journal_mode": "WAL",  # Журнал упреждающей записи: чтение не блокируется записью
+            "synchronous": "NORMAL",  # fsync только при контрольных точках WAL
+            "mmap_size": 268435456,  # Отображение файла БД в память (256 МБ)
+            "cache_size": -65536,  # Кэш страниц (64 МБ)
+            "temp_store": "MEMORY",  # Временные таблицы и индексы в памяти
+            "busy_timeout": 5000,  # Ожидание блокировки БД (мс)
+        },
+    }
+
+    def __init__(
+        self,
+        db_url="sqlite+aiosqlite:///weather_data.db",
+        sqlite_profile: str = "performance",
+        sqlite_pragmas: dict | None = None,
+        partitioning: bool = False,
+        retention_months: int | None = None,
+        pool_size: int = 10,
+        max_overflow: int = 20,
+        copy_threshold: int = 100,
+        on_conflict: str = "ignore",
+        change_only: bool = False,
+    ) -> None:
         """Инициализация менеджера базы данных.
 
         Args:
             db_url (str): url базы данных (по умолчанию SQLite).
+            sqlite_profile (str): профиль настроек SQLite из SQLITE_PROFILES.
+            sqlite_pragmas (dict | None): дополнительные PRAGMA-настройки SQLite, переопределяющие профиль.
+            partitioning (bool): хранить записи о погоде в помесячных секциях weather_data_ГГГГММ.
+            retention_months (int | None): количество хранимых месяцев в режиме секций (None - без ограничения).
+            pool_size (int): количество постоянных соединений в пуле PostgreSQL.
+            max_overflow (int): количество дополнительных соединений сверх pool_size при пиковой нагрузке.
+            copy_threshold (int): количество записей, начиная с которого PostgreSQL с драйвером asyncpg
+                загружает пакет командой COPY вместо INSERT.
+            on_conflict (str): обработка повторно полученного измерения локации: "ignore" - пропустить,
+                "update" - обновить сохраненные значения и пересчитать агрегаты.
+            change_only (bool): сохранять новую запись только при изменении измеряемых значений, иначе продлевать
+                интервал последней записи локации (valid_to, poll_count).
         """
 
-        self.engine = create_async_engine(db_url, echo=False)
+        if on_conflict not in ON_CONFLICT_MODES:
+            raise ValueError(f"Неизвестный способ обработки повторных измерений: {on_conflict}")
+
+        url = make_url(db_url)
+        engine_options = {}
+
+        # По умолчанию для файловой SQLite соединения не переиспользуются, и настройки профиля применялись бы
+        # к каждому запросу заново, поэтому соединения держим в пуле
+        if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:"):
+            engine_options["poolclass"] = AsyncAdaptedQueuePool
+
+        # Для PostgreSQL пул рассчитан на одновременную запись из многих задач; pool_pre_ping отбрасывает
+        # соединения, разорванные сервером, а pool_recycle - соединения старше часа
+        if url.get_backend_name() == "postgresql":
+            engine_options.update(
+                pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True, pool_recycle=3600
+            )
+
+        self.engine = create_async_engine(url, echo=False, **engine_options)
+        self.copy_threshold = copy_threshold
+        self.on_conflict = on_conflict
+        self.change_only = change_only
         self.AsyncSession = sessionmaker(self.engine, expire_on_commit=False, class_=AsyncSession)
 
+        # Идентификаторы уже сохраненных локаций по координатам
+        self.location_ids = {}
+
+        # Последние измерения локаций по координатам: заполняются при инициализации и обновляются при записи
+        self.latest = {}
+
+        # Помесячные секции по именам; секции описываются в отдельных метаданных вместе с копией таблицы локаций,
+        # чтобы не попадать в Base.metadata, общие для всех баз данных
+        self.partitioning = partitioning
+        self.retention_months = retention_months
+        self.partitions = {}
+        self.partition_metadata = MetaData()
+        LocationModel.__table__.to_metadata(self.partition_metadata)
+
+        if self.engine.dialect.name == "sqlite":
+            self.sqlite_pragmas = {**self.SQLITE_PROFILES[sqlite_profile], **(sqlite_pragmas or {})}
+            event.listen(self.engine.sync_engine, "connect", self.apply_sqlite_pragmas)
+
+    def apply_sqlite_pragmas(self, dbapi_connection, connection_record) -> None:
+        """Применяет PRAGMA-настройки профиля SQLite к новому соединению.
+
+        Args:
+            dbapi_connection: DBAPI-соединение с базой данных.
+            connection_record: запись пула соединений.
+        """
+
+        cursor = dbapi_connection.cursor()
+        for name, value in self.sqlite_pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    def dialect_insert(self, table: Table) -> Insert:
+        """Возвращает конструкцию INSERT диалекта базы данных с поддержкой ON CONFLICT.
+
+        Args:
+            table (Table): таблица для вставки.
+
+        Returns:
+            Insert: конструкция INSERT.
+        """
+
+        if self.engine.dialect.name == "postgresql":
+            return postgresql_insert(table)
+
+        return sqlite_insert(table)
+
+    @staticmethod
+    def migrate_legacy_schema(conn: Connection) -> int:
+        """Переносит записи из таблицы weather_data прежней схемы, в которой каждая запись хранила координаты,
+        часовой пояс и категории строками, в таблицы нормализованной схемы.
+
+        Прежняя схема сохраняла одно и то же измерение при каждом опросе, поэтому переносится только первая
+        сохраненная запись каждого измерения локации.
+
+        Args:
+            conn (Connection): синхронное соединение с базой данных в открытой транзакции.
+
+        Returns:
+            int: количество повторных измерений, которые не были перенесены.
+        """
+
+        # Прежняя схема хранила даты текстом, что допускает только SQLite
+        if conn.dialect.name != "sqlite":
+            return 0
+
+        inspector = inspect(conn)
+        if not inspector.has_table("weather_data"):
+            return 0
+        if "latitude" not in {column["name"] for column in inspector.get_columns("weather_data")}:
+            return 0
+
+        # Индексы прежней схемы называются так же, как новые, поэтому удаляем их до создания новых таблиц
+        for index in inspector.get_indexes("weather_data"):
+            conn.exec_driver_sql(f"DROP INDEX {index['name']}")
+        conn.exec_driver_sql("ALTER TABLE weather_data RENAME TO weather_data_legacy")
+
+        Base.metadata.create_all(conn)
+
+        precipitation_case = " ".join(f"WHEN '{name}' THEN {code}" for name, code in PRECIPITATION_TYPE_CODES.items())
+        direction_case = " ".join(f"WHEN '{name}' THEN {code}" for name, code in WIND_DIRECTION_CODES.items())
+
+        conn.exec_driver_sql(
+            "INSERT INTO locations (latitude, longitude, timezone) "
+            "SELECT latitude, longitude, MAX(timezone) FROM weather_data_legacy GROUP BY latitude, longitude"
+        )
+        legacy_rows = conn.exec_driver_sql("SELECT COUNT(*) FROM weather_data_legacy").scalar()
+        result = conn.exec_driver_sql(
+            "INSERT INTO weather_data (id, location_id, utc_offset_seconds, datetime_request, datetime_weather, "
+            "temperature_2m, precipitation, type_precipitation, pressure_msl, wind_speed_10m, wind_direction_10m) "
+            "SELECT w.id, l.id, w.utc_offset_seconds, w.datetime_request, w.datetime_weather, "
+            f"w.temperature_2m, w.precipitation, CASE w.type_precipitation {precipitation_case} ELSE 0 END, "
+            f"w.pressure_msl, w.wind_speed_10m, CASE w.wind_direction_10m {direction_case} ELSE 0 END "
+            "FROM weather_data_legacy w JOIN locations l ON l.latitude = w.latitude AND l.longitude = w.longitude "
+            "WHERE w.id IN (SELECT MIN(id) FROM weather_data_legacy GROUP BY latitude, longitude, datetime_weather)"
+        )
+        conn.exec_driver_sql("DROP TABLE weather_data_legacy")
+
+        return legacy_rows - result.rowcount
+
+    @staticmethod
+    def migrate_timestamps_to_epoch(conn: Connection) -> None:
+        """Преобразует даты и время записей, сохраненные в SQLite текстом, в Unix-время.
+
+        Дата и время измерения хранилась в часовом поясе локации, дата и время запроса - в локальном времени.
+
+        Args:
+            conn (Connection): синхронное соединение с базой данных в открытой транзакции.
+        """
+
+        if conn.dialect.name != "sqlite" or not inspect(conn).has_table("weather_data"):
+            return
+
+        conn.exec_driver_sql(
+            "UPDATE weather_data SET "
+            "datetime_weather = CAST(strftime('%s', datetime_weather) AS INTEGER) - utc_offset_seconds, "
+            "datetime_request = CAST(strftime('%s', datetime_request, 'utc') AS INTEGER) "
+            "WHERE typeof(datetime_weather) = 'text' OR typeof(datetime_request) = 'text'"
+        )
+
+    @staticmethod
+    def migrate_unique_observations(conn: Connection, table_name: str) -> int:
+        """Удаляет повторные измерения из таблицы, созданной до появления уникального индекса
+        (location_id, datetime_weather), оставляя первую сохраненную запись, и удаляет прежний неуникальный индекс.
+
+        Args:
+            conn (Connection): синхронное соединение с базой данных в открытой транзакции.
+            table_name (str): имя таблицы weather_data или помесячной секции.
+
+        Returns:
+            int: количество удаленных записей.
+        """
+
+        inspector = inspect(conn)
+        if not inspector.has_table(table_name):
+            return 0
+
+        indexes = {index["name"] for index in inspector.get_indexes(table_name)}
+        legacy_index = f"ix_{table_name}_location_datetime_weather"
+        if legacy_index not in indexes:
+            return 0
+
+        result = conn.exec_driver_sql(
+            f"DELETE FROM {table_name} WHERE id NOT IN "
+            f"(SELECT MIN(id) FROM {table_name} GROUP BY location_id, datetime_weather)"
+        )
+        conn.exec_driver_sql(f"DROP INDEX {legacy_index}")
+
+        return result.rowcount
+
+    @staticmethod
+    def migrate_observation_spans(conn: Connection, table_name: str) -> None:
+        """Добавляет столбцы интервала неизменных значений (valid_to, poll_count) в таблицу прежней схемы.
+
+        Args:
+            conn (Connection): синхронное соединение с базой данных в открытой транзакции.
+            table_name (str): имя таблицы weather_data или помесячной секции.
+        """
+
+        inspector = inspect(conn)
+        if not inspector.has_table(table_name):
+            return
+        if "valid_to" in {column["name"] for column in inspector.get_columns(table_name)}:
+            return
+
+        conn.exec_driver_sql(f"ALTER TABLE {table_name} ADD COLUMN valid_to INTEGER")
+        conn.exec_driver_sql(f"ALTER TABLE {table_name} ADD COLUMN poll_count INTEGER NOT NULL DEFAULT 1")
+
+    @staticmethod
+    def migrate_epoch_columns(conn: Connection, table_name: str) -> None:
+        """Расширяет столбцы Unix-времени таблицы, созданной в PostgreSQL с 32-битными столбцами, до BIGINT.
+
+        32-битное Unix-время переполняется 19 января 2038 года. В SQLite размер целых чисел не ограничен столбцом.
+
+        Args:
+            conn (Connection): синхронное соединение с базой данных в открытой транзакции.
+            table_name (str): имя таблицы weather_data, помесячной секции или таблицы агрегатов.
+        """
+
+        if conn.dialect.name != "postgresql":
+            return
+
+        for column in inspect(conn).get_columns(table_name):
+            if column["name"] in EPOCH_COLUMNS and not isinstance(column["type"], BigInteger):
+                conn.exec_driver_sql(f"ALTER TABLE {table_name} ALTER COLUMN {column['name']} TYPE BIGINT")
+
     async def init_db(self) -> None:
-        """Асинхронная инициализация базы данных, создание таблиц."""
+        """Асинхронная инициализация базы данных, создание таблиц и перенос данных из прежних схем."""
 
         async with self.engine.begin() as conn:
+            # Проверяем до переноса прежней схемы: он создает все таблицы, включая таблицы агрегатов
+            has_rollups = await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table("weather_rollup_hourly"))
+            removed = await conn.run_sync(self.migrate_legacy_schema)
+            await conn.run_sync(self.migrate_timestamps_to_epoch)
+            removed += await conn.run_sync(self.migrate_unique_observations, WeatherDataModel.__tablename__)
+            await conn.run_sync(self.migrate_observation_spans, WeatherDataModel.__tablename__)
             await conn.run_sync(Base.metadata.create_all)
 
-    async def add_weather_data(self, weather_data: dict) -> None:
-        """Асинхронно добавляет новую запись о погоде в базу данных.
+            # create_all не добавляет новые индексы в уже существующие таблицы и не меняет типы столбцов
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    await conn.run_sync(index.create, checkfirst=True)
+                await conn.run_sync(self.migrate_epoch_columns, table.name)
 
-        Args:
-            weather_data (dict): словарь с данными о погоде.
+            if self.partitioning:
+                removed += await self.init_partitions(conn)
+
+        if self.partitioning and self.retention_months is not None:
+            await self.apply_retention()
+
+        # Агрегаты для записей, сохраненных до появления таблиц агрегатов или учитывавшие удаленные повторы
+        if not has_rollups or removed:
+            await self.rebuild_rollups()
+
+        await self.load_latest()
+
+    async def load_latest(self) -> None:
+        """Асинхронно загружает последние измерения всех локаций в кэш latest.
+
+        Секции просматриваются от новых к старым, пока не найдены измерения всех локаций.
         """
-        async with self.AsyncSession() as session:
-            async with session.begin():
-                new_data = WeatherDataModel(
-                    latitude=weather_data["latitude"],
-                    longitude=weather_data["longitude"],
-                    timezone=weather_data["timezone"],
-                    utc_offset_seconds=weather_data["utc_offset_seconds"],
-                    datetime_request=weather_data["datetime_request"],
-                    datetime_weather=weather_data["datetime_weather"],
-                    temperature_2m=weather_data["temperature_2m"],
-                    precipitation=weather_data["precipitation"],
-                    type_precipitation=weather_data["type_precipitation"],
-                    pressure_msl=weather_data["pressure_msl"],
-                    wind_speed_10m=weather_data["wind_speed_10m"],
-                    wind_direction_10m=weather_data["wind_direction_10m"],
+
+        latest = {}
+        locations = LocationModel.__table__
+
+        async with self.engine.connect() as conn:
+
+            total = (await conn.execute(select(func.count()).select_from(locations))).scalar()
+            await self.refresh_partitions(conn)
+
+            for table in reversed(self.get_weather_tables()):
+                if len(latest) == total:
+                    break
+
+                newest = (
+                    select(table.c.location_id, func.max(table.c.datetime_weather).label("datetime_weather"))
+                    .group_by(table.c.location_id)
+                    .subquery()
+                )
+                query = (
+                    self.select_weather_data(table=table)
+                    .join(
+                        newest,
+                        (table.c.location_id == newest.c.location_id)
+                        & (table.c.datetime_weather == newest.c.datetime_weather),
+                    )
+                    .order_by(None)
                 )
-                session.add(new_data)
-                await session.commit()
+                for row in await conn.execute(query):
+                    row = decode_weather_row(row)
+                    latest.setdefault((row.latitude, row.longitude), row)
 
-    async def get_all_weather_data(self) -> list[dict]:
-        """Асинхронно возвращает все записи о погоде из базы данных.
+        self.latest = latest
+
+    def update_latest(self, weather_data: list[dict], rows: list[dict]) -> None:
+        """Обновляет кэш последних измерений сохраненными строками.
+
+        Args:
+            weather_data (list[dict]): исходные словари с данными о погоде (координаты и часовые пояса локаций).
+            rows (list[dict]): сохраненные строки таблицы weather_data.
+        """
+
+        locations = {}
+        for item in weather_data:
+            location_id = self.location_ids[(item["latitude"], item["longitude"])]
+            locations[location_id] = (item["latitude"], item["longitude"], item["timezone"])
+
+        for row in rows:
+            latitude, longitude, timezone = locations[row["location_id"]]
+            current = self.latest.get((latitude, longitude))
+
+            if current is None or row["datetime_weather"] >= current.datetime_weather:
+                self.latest[(latitude, longitude)] = make_weather_row(row, latitude, longitude, timezone)
+
+    def get_latest(self, location: tuple[float, float]) -> WeatherRow | None:
+        """Возвращает последнее измерение локации из кэша без обращения к базе данных.
+
+        Args:
+            location (tuple[float, float]): локация в виде пары (широта, долгота).
 
         Returns:
-            list: список всех записей о погоде
+            WeatherRow | None: последнее измерение или None, если измерений нет.
+        """
+
+        return self.latest.get(location)
+
+    def get_latest_many(
+        self, locations: list[tuple[float, float]] | None = None
+    ) -> dict[tuple[float, float], WeatherRow]:
+        """Возвращает последние измерения нескольких локаций из кэша без обращения к базе данных.
+
+        Args:
+            locations (list[tuple[float, float]] | None): локации в виде пар (широта, долгота) (по умолчанию все).
+
+        Returns:
+            dict[tuple[float, float], WeatherRow]: последние измерения по локациям, у которых они есть.
+        """
+
+        if locations is None:
+            return dict(self.latest)
+
+        return {location: self.latest[location] for location in locations if location in self.latest}
+
+    def get_partition_table(self, name: str) -> Table:
+        """Возвращает описание помесячной секции по образцу таблицы weather_data.
+
+        Args:
+            name (str): имя секции вида weather_data_ГГГГММ.
+
+        Returns:
+            Table: таблица секции.
+        """
+
+        table = self.partition_metadata.tables.get(name)
+        if table is None:
+            table = WeatherDataModel.__table__.to_metadata(self.partition_metadata, name=name)
+            # Имена индексов в SQLite и PostgreSQL уникальны в пределах схемы
+            for index in table.indexes:
+                index.name = index.name.replace(WeatherDataModel.__tablename__, name, 1)
+
+        return table
+
+    async def init_partitions(self, conn: AsyncConnection) -> int:
+        """Асинхронно находит существующие секции, переносит в секции записи из таблицы weather_data
+        и сверяет счетчик идентификаторов с сохраненными записями.
+
+        Args:
+            conn (AsyncConnection): соединение с базой данных в открытой транзакции.
+
+        Returns:
+            int: количество повторных измерений, удаленных из существующих секций.
+        """
+
+        removed = 0
+        names = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
+        for name in names:
+            if is_partition_name(name):
+                removed += await conn.run_sync(self.migrate_unique_observations, name)
+                await conn.run_sync(self.migrate_observation_spans, name)
+                await conn.run_sync(self.migrate_epoch_columns, name)
+                table = self.partitions[name] = self.get_partition_table(name)
+                for index in table.indexes:
+                    await conn.run_sync(index.create, checkfirst=True)
+
+        data = WeatherDataModel.__table__
+        result = await conn.execute(select(func.min(data.c.datetime_weather), func.max(data.c.datetime_weather)))
+        first, last = result.one()
+
+        if first is not None:
+            name = get_partition_name(first)
+            while True:
+                start, end = get_partition_bounds(name)
+                if start > last:
+                    break
+
+                table = await self.create_partition(conn, name)
+                period = data.c.datetime_weather >= start, data.c.datetime_weather < end
+                columns = [column.name for column in data.columns]
+                query = self.dialect_insert(table).from_select(columns, select(data).where(*period))
+                await conn.execute(query.on_conflict_do_nothing())
+                await conn.execute(delete(data).where(*period))
+                name = get_partition_name(end)
+
+        # Счетчик не меньше наибольшего идентификатора в weather_data и во всех секциях
+        sequence = WeatherDataSequenceModel.__table__
+        max_ids = [select(func.max(table.c.id)).scalar_subquery() for table in [data, *self.partitions.values()]]
+        last_id = (await conn.execute(select(func.coalesce(func.max(sequence.c.last_id), 0)))).scalar()
+        for max_id in max_ids:
+            last_id = max(last_id, (await conn.execute(select(func.coalesce(max_id, 0)))).scalar())
+
+        await conn.execute(delete(sequence))
+        await conn.execute(insert(sequence), {"id": 1, "last_id": last_id})
+
+        return removed
+
+    async def create_partition(self, conn: AsyncConnection, name: str) -> Table:
+        """Асинхронно создает помесячную секцию, если она еще не существует.
+
+        Args:
+            conn (AsyncConnection): соединение с базой данных в открытой транзакции.
+            name (str): имя секции вида weather_data_ГГГГММ.
+
+        Returns:
+            Table: таблица секции.
+        """
+
+        table = self.partitions.get(name)
+        if table is None:
+            table = self.get_partition_table(name)
+
+            # Секцию могут одновременно создавать несколько процессов: в PostgreSQL параллельные CREATE TABLE
+            # IF NOT EXISTS не видят друг друга до фиксации, поэтому создание секции сериализуется блокировкой
+            # до конца транзакции, а уже созданная таблица и ее индексы пропускаются
+            if conn.dialect.name == "postgresql":
+                await conn.execute(select(func.pg_advisory_xact_lock(int(name[len(PARTITION_PREFIX):]))))
+
+            await conn.execute(CreateTable(table, if_not_exists=True))
+            for index in table.indexes:
+                await conn.execute(CreateIndex(index, if_not_exists=True))
+            self.partitions[name] = table
+
+        return table
+
+    async def create_partitions(self, names: set[str]) -> None:
+        """Асинхронно создает недостающие помесячные секции в отдельной транзакции.
+
+        Создание таблицы с внешним ключом блокирует в PostgreSQL таблицу локаций, поэтому в одной транзакции
+        со вставкой локаций оно приводило бы к взаимной блокировке параллельных записей.
+
+        Args:
+            names (set[str]): имена секций вида weather_data_ГГГГММ.
         """
 
-        async with self.AsyncSession() as session:
+        missing = sorted(name for name in names if name not in self.partitions)
+        if missing:
+            async with self.engine.begin() as conn:
+                for name in missing:
+                    await self.create_partition(conn, name)
 
-            result = await session.execute(select(WeatherDataModel))
-            weather_data_list = result.mappings().all()
-            data = [item["WeatherDataModel"].to_dict() for item in weather_data_list]
+    async def refresh_partitions(self, conn: AsyncConnection | None = None) -> set[str]:
+        """Асинхронно сверяет список помесячных секций с таблицами базы данных.
 
-            return data
+        Секции создаются и удаляются также другими процессами, работающими с той же базой данных, поэтому список
+        обновляется перед чтением записей о погоде.
+
+        Args:
+            conn (AsyncConnection | None): соединение с базой данных (по умолчанию - новое соединение).
+
+        Returns:
+            set[str]: имена секций, удаленных из базы данных.
+        """
+
+        if not self.partitioning:
+            return set()
+        if conn is None:
+            async with self.engine.connect() as conn:
+                return await self.refresh_partitions(conn)
+
+        names = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
+        existing = {name for name in names if is_partition_name(name)}
+
+        dropped = self.partitions.keys() - existing
+        for name in dropped:
+            self.partition_metadata.remove(self.partitions.pop(name))
+        for name in existing - self.partitions.keys():
+            self.partitions[name] = self.get_partition_table(name)
+
+        return dropped
+
+    def get_weather_tables(self, since: int | None = None, until: int | None = None) -> list[Table]:
+        """Возвращает таблицы с записями о погоде за период в порядке времени измерения.
+
+        Args:
+            since (int | None): начало периода (Unix-время, включительно).
+            until (int | None): конец периода (Unix-время, не включительно).
+
+        Returns:
+            list[Table]: таблица weather_data или помесячные секции, пересекающиеся с периодом.
+        """
+
+        if not self.partitioning:
+            return [WeatherDataModel.__table__]
+
+        tables = []
+        for name in sorted(self.partitions):
+            start, end = get_partition_bounds(name)
+            if (since is None or end > since) and (until is None or start < until):
+                tables.append(self.partitions[name])
+
+        return tables
+
+    def get_weather_source(self, since: int | None = None, until: int | None = None) -> FromClause:
+        """Возвращает источник записей о погоде за период для агрегирующих запросов.
+
+        Args:
+            since (int | None): начало периода (Unix-время, включительно).
+            until (int | None): конец периода (Unix-время, не включительно).
+
+        Returns:
+            FromClause: таблица weather_data или объединение (UNION ALL) подходящих помесячных секций.
+        """
+
+        tables = self.get_weather_tables(since, until)
+        if not self.partitioning:
+            return tables[0]
+        if not tables:
+            # Пустая выборка с теми же столбцами
+            data = WeatherDataModel.__table__
+            return select(data).where(data.c.id.is_(None)).subquery("weather_data")
+
+        return union_all(*(select(table) for table in tables)).subquery("weather_data")
+
+    async def drop_partitions_before(self, before: datetime) -> list[str]:
+        """Асинхронно удаляет помесячные секции, все записи которых измерены раньше указанного момента.
+
+        Секция удаляется целиком (DROP TABLE) без построчного удаления. Агрегаты при этом сохраняются.
+        Интервалы неизменных значений, продолжающиеся после этого момента, предварительно разделяются.
+
+        Args:
+            before (datetime): момент времени (без часового пояса - UTC).
+
+        Returns:
+            list[str]: имена удаленных секций.
+        """
+
+        await self.split_observation_spans(before)
+
+        before_epoch = datetime_to_epoch(before, 0)
+
+        async with self.engine.begin() as conn:
+            await self.refresh_partitions(conn)
+            names = [name for name in sorted(self.partitions) if get_partition_bounds(name)[1] <= before_epoch]
+            for name in names:
+                await conn.run_sync(self.partitions[name].drop, checkfirst=True)
+
+        for name in names:
+            self.partition_metadata.remove(self.partitions.pop(name))
+
+        return names
+
+    async def apply_retention(self) -> list[str]:
+        """Асинхронно удаляет секции старше retention_months месяцев, включая текущий.
+
+        Returns:
+            list[str]: имена удаленных секций.
+        """
+
+        if self.retention_months is None:
+            return []
+
+        now = datetime.now(timezone.utc)
+        months = now.year * 12 + now.month - 1 - (self.retention_months - 1)
+
+        return await self.drop_partitions_before(datetime(months // 12, months % 12 + 1, 1))
+
+    async def split_observation_spans(self, before: datetime) -> int:
+        """Асинхронно разделяет интервалы неизменных значений, начатые раньше указанного момента и продолжающиеся
+        после него, на запись с измерениями до момента и новую запись с остальными измерениями.
+
+        Перенос в архив и удаление записей выполняются по времени первого измерения записи, поэтому без разделения
+        вместе с записью удалялись бы и ее более поздние измерения, а пересчет агрегатов их бы не учитывал.
+
+        Args:
+            before (datetime): момент времени (без часового пояса - UTC).
+
+        Returns:
+            int: количество разделенных интервалов.
+        """
+
+        before_epoch = datetime_to_epoch(before, 0)
+        tails = []
+
+        async with self.engine.begin() as conn:
+            await self.refresh_partitions(conn)
+            for table in self.get_weather_tables(None, before_epoch):
+                spans = await conn.execute(
+                    select(table).where(
+                        table.c.datetime_weather < before_epoch,
+                        table.c.valid_to >= before_epoch,
+                        table.c.poll_count > 1,
+                    )
+                )
+
+                for span in spans.mappings().all():
+                    polls = get_poll_times(span["datetime_weather"], span["valid_to"], span["poll_count"])
+                    head = sum(moment < before_epoch for moment in polls)
+                    await conn.execute(
+                        update(table).where(table.c.id == span["id"]).values(valid_to=polls[head - 1], poll_count=head)
+                    )
+
+                    tail = dict(span)
+                    del tail["id"]
+                    tail.update(
+                        datetime_request=span["datetime_request"] + polls[head] - span["datetime_weather"],
+                        datetime_weather=polls[head],
+                        poll_count=len(polls) - head,
+                    )
+                    tails.append(tail)
+
+            await self.insert_weather_rows(conn, tails)
+
+        # Последним измерением локации может оказаться новая запись
+        if tails:
+            await self.load_latest()
+
+        return len(tails)
+
+    async def get_location_ids(self, conn: AsyncConnection, weather_data: list[dict]) -> dict:
+        """Асинхронно возвращает идентификаторы локаций записей о погоде, добавляя новые локации в базу данных.
+
+        Args:
+            conn (AsyncConnection): соединение с базой данных в открытой транзакции.
+            weather_data (list[dict]): список словарей с данными о погоде.
+
+        Returns:
+            dict: идентификаторы локаций по парам (широта, долгота).
+        """
+
+        location_ids = {}
+        missing = {}
+
+        for item in weather_data:
+            key = (item["latitude"], item["longitude"])
+            if key in self.location_ids:
+                location_ids[key] = self.location_ids[key]
+            else:
+                missing[key] = item["timezone"]
+
+        if missing:
+            table = LocationModel.__table__
+            await conn.execute(
+                self.dialect_insert(table).on_conflict_do_nothing(),
+                [
+                    {"latitude": latitude, "longitude": longitude, "timezone": timezone}
+                    for (latitude, longitude), timezone in missing.items()
+                ],
+            )
+            result = await conn.execute(
+                select(table.c.latitude, table.c.longitude, table.c.id).where(
+                    tuple_(table.c.latitude, table.c.longitude).in_(list(missing))
+                )
+            )
+            location_ids.update({(latitude, longitude): id for latitude, longitude, id in result})
+
+        return location_ids
+
+    @staticmethod
+    def encode_weather_data(weather_data: dict, location_id: int) -> dict:
+        """Преобразует словарь с данными о погоде в строку таблицы weather_data.
+
+        Args:
+            weather_data (dict): словарь с данными о погоде.
+            location_id (int): идентификатор локации.
+
+        Returns:
+            dict: значения столбцов таблицы weather_data.
+        """
+
+        return {
+            "location_id": location_id,
+            "utc_offset_seconds": weather_data["utc_offset_seconds"],
+            "datetime_request": datetime_to_epoch(weather_data["datetime_request"]),
+            "datetime_weather": datetime_to_epoch(weather_data["datetime_weather"], weather_data["utc_offset_seconds"]),
+            "temperature_2m": weather_data["temperature_2m"],
+            "precipitation": weather_data["precipitation"],
+            "type_precipitation": PRECIPITATION_TYPE_CODES[weather_data["type_precipitation"]],
+            "pressure_msl": weather_data["pressure_msl"],
+            "wind_speed_10m": weather_data["wind_speed_10m"],
+            "wind_direction_10m": WIND_DIRECTION_CODES[weather_data["wind_direction_10m"]],
+            "wind_direction_degrees": weather_data.get("wind_direction_degrees"),
+        }
+
+    async def add_weather_data(self, weather_data: dict) -> None:
+        """Асинхронно добавляет новую запись о погоде в базу данных.
+
+        Args:
+            weather_data (dict): словарь с данными о погоде.
+        """
+
+        await self.add_weather_data_many([weather_data])
+
+    async def add_weather_data_many(self, weather_data: list[dict]) -> None:
+        """Асинхронно добавляет несколько записей о погоде в базу данных одной транзакцией.
+
+        Записи вставляются одним запросом INSERT в режиме executemany, минуя создание ORM-объектов.
+
+        Args:
+            weather_data (list[dict]): список словарей с данными о погоде.
+        """
+
+        if not weather_data:
+            return
+
+        names = set()
+        if self.partitioning:
+            names = {
+                get_partition_name(datetime_to_epoch(item["datetime_weather"], item["utc_offset_seconds"]))
+                for item in weather_data
+            }
+
+        partitions = dict(self.partitions)
+        for attempt in range(2):
+            await self.create_partitions(names)
+            created = dict(self.partitions)
+            try:
+                location_ids, changed = await self.write_weather_data(weather_data)
+                break
+            except Exception as e:
+                # Секции, созданные в отмененной транзакции, не существуют
+                self.partitions = created
+                # Секцию могла удалить очистка старых записей в другом процессе: тогда список секций обновляется,
+                # недостающая секция создается заново и запись повторяется
+                if attempt or not isinstance(e, DBAPIError) or not await self.refresh_partitions():
+                    raise
+
+        # Запоминаем локации и последние измерения только после успешной фиксации транзакции
+        self.location_ids.update(location_ids)
+        self.update_latest(weather_data, changed)
+
+        if self.partitioning and len(self.partitions) > len(partitions) and self.retention_months is not None:
+            await self.apply_retention()
+
+    async def write_weather_data(self, weather_data: list[dict]) -> tuple[dict, list[dict]]:
+        """Асинхронно сохраняет записи о погоде и обновляет агрегаты одной транзакцией.
+
+        Args:
+            weather_data (list[dict]): список словарей с данными о погоде.
+
+        Returns:
+            tuple[dict, list[dict]]: идентификаторы локаций по координатам и сохраненные строки (вставленные,
+                обновленные и продленные).
+        """
+
+        async with self.engine.begin() as conn:
+            location_ids = await self.get_location_ids(conn, weather_data)
+            rows = [
+                self.encode_weather_data(item, location_ids[(item["latitude"], item["longitude"])])
+                for item in weather_data
+            ]
+
+            if self.change_only:
+                stored, changed = await self.store_changes(conn, rows)
+            else:
+                stored = changed = await self.insert_weather_rows(conn, rows)
+
+            # Обновленные измерения меняют уже учтенные значения, поэтому их агрегаты пересчитываются заново
+            if self.on_conflict == "update":
+                await self.recompute_rollups(conn, stored)
+            else:
+                await self.update_rollups(conn, stored)
+
+        return location_ids, changed
+
+    async def insert_weather_rows(self, conn: AsyncConnection, rows: list[dict]) -> list[dict]:
+        """Асинхронно вставляет строки в таблицу weather_data или в помесячные секции.
+
+        Args:
+            conn (AsyncConnection): соединение с базой данных в открытой транзакции.
+            rows (list[dict]): строки таблицы weather_data без идентификаторов.
+
+        Returns:
+            list[dict]: сохраненные строки (см. bulk_insert).
+        """
+
+        if not rows:
+            return []
+        if self.partitioning:
+            return await self.insert_into_partitions(conn, rows)
+
+        return await self.bulk_insert(conn, WeatherDataModel.__table__, rows)
+
+    async def get_latest_rows(self, conn: AsyncConnection, location_ids: set[int]) -> dict[int, tuple[Table, dict]]:
+        """Асинхронно находит последние сохраненные записи локаций.
+
+        Секции просматриваются от новых к старым, пока не найдены записи всех локаций.
+
+        Args:
+            conn (AsyncConnection): соединение с базой данных.
+            location_ids (set[int]): идентификаторы локаций.
+
+        Returns:
+            dict[int, tuple[Table, dict]]: таблица и значения столбцов последней записи по идентификатору локации.
+        """
+
+        latest = {}
+        await self.refresh_partitions(conn)
+        for table in reversed(self.get_weather_tables()):
+            missing = location_ids - latest.keys()
+            if not missing:
+                break
+
+            newest = (
+                select(table.c.location_id, func.max(table.c.datetime_weather).label("datetime_weather"))
+                .where(table.c.location_id.in_(missing))
+                .group_by(table.c.location_id)
+                .subquery()
+            )
+            query = select(table).join(
+                newest,
+                (table.c.location_id == newest.c.location_id) & (table.c.datetime_weather == newest.c.datetime_weather),
+            )
+            for row in await conn.execute(query):
+                stored = row._asdict()
+                stored["valid_to"] = stored["valid_to"] or stored["datetime_weather"]
+                latest[stored["location_id"]] = (table, stored)
+
+        return latest
+
+    async def store_changes(self, conn: AsyncConnection, rows: list[dict]) -> tuple[list[dict], list[dict]]:
+        """Асинхронно сохраняет строки в режиме хранения изменений.
+
+        Измерение с теми же значениями, что у последней записи локации, не добавляется, а продлевает ее интервал:
+        valid_to становится временем измерения, poll_count увеличивается. Измерения, уже покрытые интервалом
+        последней записи, пропускаются.
+
+        Args:
+            conn (AsyncConnection): соединение с базой данных в открытой транзакции.
+            rows (list[dict]): строки таблицы weather_data без идентификаторов.
+
+        Returns:
+            tuple[list[dict], list[dict]]: учтенные измерения (вставленные и продлившие запись) для обновления
+                агрегатов и сохраненные строки (вставленные и продленные).
+        """
+
+        latest = await self.get_latest_rows(conn, {row["location_id"] for row in rows})
+        new_rows, extended, polls = [], {}, []
+
+        for row in sorted(rows, key=lambda row: row["datetime_weather"]):
+            table, stored = latest.get(row["location_id"], (None, None))
+
+            if stored is not None and row["datetime_weather"] <= stored["valid_to"]:
+                continue
+
+            if stored is not None and all(row[name] == stored[name] for name in MEASURED_COLUMNS):
+                stored["valid_to"] = row["datetime_weather"]
+                stored["poll_count"] += 1
+                # Записи, сохраненные ранее, обновляются; новые записи пакета вставляются уже продленными
+                if table is not None:
+                    extended[stored["id"]] = (table, stored)
+                    run = None
+                else:
+                    run = (stored["location_id"], stored["datetime_weather"])
+            else:
+                row = {**row, "valid_to": row["datetime_weather"], "poll_count": 1}
+                new_rows.append(row)
+                latest[row["location_id"]] = (None, row)
+                run = (row["location_id"], row["datetime_weather"])
+
+            polls.append((run, row))
+
+        # Новая запись может быть отклонена уникальным индексом при одновременной записи из другого процесса,
+        # тогда ее измерения не учитываются в агрегатах
+        changed = await self.insert_weather_rows(conn, new_rows)
+        inserted = {(row["location_id"], row["datetime_weather"]) for row in changed}
+
+        for table, stored in extended.values():
+            await conn.execute(
+                update(table)
+                .where(table.c.id == stored["id"])
+                .values(valid_to=stored["valid_to"], poll_count=stored["poll_count"])
+            )
+
+        changed.extend(stored for _, stored in extended.values())
+
+        return [row for run, row in polls if run is None or run in inserted], changed
+
+    async def insert_into_partitions(self, conn: AsyncConnection, rows: list[dict]) -> list[dict]:
+        """Асинхронно вставляет строки в помесячные секции по времени измерения, создавая недостающие секции.
+
+        Идентификаторы выдаются из общего счетчика, чтобы оставаться уникальными во всех секциях.
+
+        Args:
+            conn (AsyncConnection): соединение с базой данных в открытой транзакции.
+            rows (list[dict]): строки таблицы weather_data без идентификаторов.
+
+        Returns:
+            list[dict]: сохраненные строки (см. bulk_insert).
+        """
+
+        groups = {}
+        for row in rows:
+            groups.setdefault(get_partition_name(row["datetime_weather"]), []).append(row)
+
+        # Секции создаются до блокировки счетчика, которого могут ждать параллельные записи
+        tables = {name: await self.create_partition(conn, name) for name in groups}
+
+        sequence = WeatherDataSequenceModel.__table__
+        result = await conn.execute(
+            update(sequence).values(last_id=sequence.c.last_id + len(rows)).returning(sequence.c.last_id)
+        )
+        first_id = result.scalar_one() - len(rows) + 1
+
+        for id, row in enumerate(rows, start=first_id):
+            row["id"] = id
+
+        stored = []
+        for name, group in groups.items():
+            stored.extend(await self.bulk_insert(conn, tables[name], group))
+
+        return stored
+
+    def upsert_weather_data(self, table: Table, columns: list[str], source: Select | None = None) -> Insert:
+        """Формирует запрос вставки записей о погоде с обработкой повторных измерений по способу on_conflict.
+
+        Повторы отсекаются уникальным индексом (location_id, datetime_weather) в самой базе данных.
+        Запрос возвращает сохраненные строки целиком (RETURNING): в режиме "ignore" - только вставленные, чтобы
+        агрегаты учитывали только их, в режиме "update" - также обновленные.
+
+        Args:
+            table (Table): таблица weather_data или помесячная секция.
+            columns (list[str]): вставляемые столбцы.
+            source (Select | None): запрос-источник строк для INSERT ... SELECT (по умолчанию - значения параметров).
+
+        Returns:
+            Insert: запрос вставки.
+        """
+
+        query = self.dialect_insert(table)
+        if source is not None:
+            query = query.from_select(columns, source)
+
+        conflict = [table.c.location_id, table.c.datetime_weather]
+        if self.on_conflict == "update":
+            query = query.on_conflict_do_update(
+                index_elements=conflict,
+                set_={name: query.excluded[name] for name in columns if name not in CONFLICT_KEY_COLUMNS},
+            )
+        else:
+            query = query.on_conflict_do_nothing(index_elements=conflict)
+
+        return query.returning(*table.c)
+
+    async def bulk_insert(self, conn: AsyncConnection, table: Table, rows: list[dict]) -> list[dict]:
+        """Асинхронно вставляет пакет строк в таблицу, пропуская или обновляя повторные измерения.
+
+        В PostgreSQL с драйвером asyncpg пакеты от copy_threshold строк загружаются командой COPY во временную
+        таблицу и переносятся одним запросом INSERT ... SELECT ... ON CONFLICT; в остальных случаях выполняется
+        INSERT ... ON CONFLICT в режиме executemany.
+
+        Args:
+            conn (AsyncConnection): соединение с базой данных в открытой транзакции.
+            table (Table): таблица для вставки.
+            rows (list[dict]): строки таблицы с одинаковым набором столбцов.
+
+        Returns:
+            list[dict]: сохраненные строки со всеми столбцами: в режиме "ignore" - только вставленные,
+                в режиме "update" - вставленные и обновленные.
+        """
+
+        columns = list(rows[0])
+
+        if conn.dialect.driver != "asyncpg" or len(rows) < self.copy_threshold:
+            result = await conn.execute(self.upsert_weather_data(table, columns), rows)
+        else:
+            # Временная таблица удаляется при фиксации транзакции, COPY выполняется в том же соединении
+            incoming = Table(
+                f"{table.name}_incoming",
+                MetaData(),
+                *(Column(name, table.c[name].type) for name in columns),
+                prefixes=["TEMPORARY"],
+                postgresql_on_commit="DROP",
+            )
+            await conn.run_sync(incoming.create)
+
+            raw_connection = await conn.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                incoming.name,
+                records=[tuple(row[column] for column in columns) for row in rows],
+                columns=columns,
+            )
+            result = await conn.execute(self.upsert_weather_data(table, columns, select(incoming)))
+
+        return [row._asdict() for row in result]
+
+    async def update_rollups(self, conn: AsyncConnection, rows: list[dict]) -> None:
+        """Асинхронно добавляет новые записи о погоде в почасовые и посуточные агрегаты.
+
+        Args:
+            conn (AsyncConnection): соединение с базой данных в открытой транзакции.
+            rows (list[dict]): добавленные строки таблицы weather_data.
+        """
+
+        # Все записи пакета могли оказаться повторами
+        if not rows:
+            return
+
+        for table, size in ROLLUPS.values():
+            await self.upsert_rollup_buckets(conn, table, self.collect_rollup_buckets(rows, size))
+
+    async def upsert_rollup_buckets(self, conn: AsyncConnection, table: Table, buckets: list[dict]) -> None:
+        """Асинхронно добавляет строки агрегатов к сохраненным агрегатам тех же локаций и интервалов.
+
+        Args:
+            conn (AsyncConnection): соединение с базой данных в открытой транзакции.
+            table (Table): таблица агрегатов.
+            buckets (list[dict]): строки таблицы агрегатов (см. collect_rollup_buckets).
+        """
+
+        query = self.dialect_insert(table)
+        excluded = query.excluded
+        query = query.on_conflict_do_update(
+            index_elements=[table.c.location_id, table.c.bucket],
+            set_={
+                "observations": table.c.observations + excluded.observations,
+                "temperature_min": case(
+                    (excluded.temperature_min < table.c.temperature_min, excluded.temperature_min),
+                    else_=table.c.temperature_min,
+                ),
+                "temperature_max": case(
+                    (excluded.temperature_max > table.c.temperature_max, excluded.temperature_max),
+                    else_=table.c.temperature_max,
+                ),
+                "temperature_sum": table.c.temperature_sum + excluded.temperature_sum,
+                "precipitation_sum": table.c.precipitation_sum + excluded.precipitation_sum,
+                "wind_speed_sum": table.c.wind_speed_sum + excluded.wind_speed_sum,
+            },
+        )
+        await conn.execute(query, buckets)
+
+    @staticmethod
+    def collect_rollup_buckets(rows: list[dict], size: int) -> list[dict]:
+        """Собирает строки таблицы агрегатов по измерениям.
+
+        Args:
+            rows (list[dict]): измерения со столбцами location_id, datetime_weather, temperature_2m, precipitation
+                и wind_speed_10m.
+            size (int): длительность интервала агрегирования (с).
+
+        Returns:
+            list[dict]: строки таблицы агрегатов.
+        """
+
+        buckets = {}
+
+        for row in rows:
+            key = (row["location_id"], row["datetime_weather"] - row["datetime_weather"] % size)
+            temperature = row["temperature_2m"]
+            bucket = buckets.get(key)
+
+            if bucket is None:
+                buckets[key] = {
+                    "location_id": key[0],
+                    "bucket": key[1],
+                    "observations": 1,
+                    "temperature_min": temperature,
+                    "temperature_max": temperature,
+                    "temperature_sum": temperature,
+                    "precipitation_sum": row["precipitation"],
+                    "wind_speed_sum": row["wind_speed_10m"],
+                }
+            else:
+                bucket["observations"] += 1
+                bucket["temperature_min"] = min(bucket["temperature_min"], temperature)
+                bucket["temperature_max"] = max(bucket["temperature_max"], temperature)
+                bucket["temperature_sum"] += temperature
+                bucket["precipitation_sum"] += row["precipitation"]
+                bucket["wind_speed_sum"] += row["wind_speed_10m"]
+
+        return list(buckets.values())
+
+    async def rebuild_rollups(self) -> None:
+        """Асинхронно пересчитывает почасовые и посуточные агрегаты по всем записям о погоде в базе данных.
+
+        Используется после загрузки исторических данных в обход add_weather_data_many. Агрегаты периодов до первой
+        хранящейся записи (записи перенесены в архив или удалены по сроку хранения) сохраняются.
+        """
+
+        async with self.engine.begin() as conn:
+            await self.recompute_rollups(conn)
+
+    async def recompute_rollups(self, conn: AsyncConnection, rows: list[dict] | None = None) -> None:
+        """Асинхронно пересчитывает агрегаты по сохраненным записям о погоде.
+
+        Записи из одного измерения агрегируются запросом GROUP BY, интервалы неизменных значений из нескольких
+        измерений разворачиваются в отдельные измерения и добавляются к агрегатам.
+
+        Args:
+            conn (AsyncConnection): соединение с базой данных в открытой транзакции.
+            rows (list[dict] | None): измененные строки таблицы weather_data; пересчитываются агрегаты их локаций
+                за охватываемый ими период. По умолчанию пересчитываются все агрегаты начиная с интервала
+                первой хранящейся записи, более ранние агрегаты (по удаленным записям) сохраняются.
+        """
+
+        if rows is not None and not rows:
+            return
+
+        if rows is None:
+            await self.refresh_partitions(conn)
+            source = self.get_weather_source()
+            first = await conn.scalar(select(func.min(source.c.datetime_weather)))
+            if first is None:
+                return
+
+        for table, size in ROLLUPS.values():
+            until = None
+            if rows is None:
+                since = first // size * size
+            else:
+                since = min(row["datetime_weather"] for row in rows) // size * size
+                until = max(row["datetime_weather"] for row in rows) // size * size + size
+
+            data = self.get_weather_source(since, until)
+            bucket = data.c.datetime_weather - data.c.datetime_weather % size
+            query = select(
+                data.c.location_id,
+                bucket,
+                func.count(),
+                func.min(data.c.temperature_2m),
+                func.max(data.c.temperature_2m),
+                func.sum(data.c.temperature_2m),
+                func.sum(data.c.precipitation),
+                func.sum(data.c.wind_speed_10m),
+            ).where(data.c.poll_count == 1, data.c.datetime_weather >= since).group_by(data.c.location_id, bucket)
+            stale = delete(table).where(table.c.bucket >= since)
+
+            # Интервал может начинаться в более ранней секции, поэтому секции отбираются только по концу периода
+            spans = self.get_weather_source(None, until)
+            runs = select(
+                spans.c.location_id,
+                spans.c.datetime_weather,
+                spans.c.valid_to,
+                spans.c.poll_count,
+                spans.c.temperature_2m,
+                spans.c.precipitation,
+                spans.c.wind_speed_10m,
+            ).where(spans.c.poll_count > 1, spans.c.valid_to >= since)
+
+            if rows is not None:
+                location_ids = {row["location_id"] for row in rows}
+                query = query.where(data.c.location_id.in_(location_ids), data.c.datetime_weather < until)
+                stale = stale.where(table.c.location_id.in_(location_ids), table.c.bucket < until)
+                runs = runs.where(spans.c.location_id.in_(location_ids), spans.c.datetime_weather < until)
+
+            await conn.execute(stale)
+            await conn.execute(
+                insert(table).from_select(
+                    [
+                        "location_id",
+                        "bucket",
+                        "observations",
+                        "temperature_min",
+                        "temperature_max",
+                        "temperature_sum",
+                        "precipitation_sum",
+                        "wind_speed_sum",
+                    ],
+                    query,
+                )
+            )
+
+            polls = []
+            for run in await conn.execute(runs):
+                for moment in get_poll_times(run.datetime_weather, run.valid_to, run.poll_count):
+                    if since <= moment and (until is None or moment < until):
+                        polls.append({**run._asdict(), "datetime_weather": moment})
+            if polls:
+                await self.upsert_rollup_buckets(conn, table, self.collect_rollup_buckets(polls, size))
+
+    async def get_rollups(
+        self,
+        grain: str = "hour",
+        location: tuple[float, float] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+    ) -> list[dict]:
+        """Асинхронно возвращает агрегаты данных о погоде по локациям за интервалы времени.
+
+        Границы периода без часового пояса считаются заданными в UTC.
+
+        Args:
+            grain (str): длительность интервала ("hour" - час, "day" - сутки UTC).
+            location (tuple[float, float] | None): локация в виде пары (широта, долгота).
+            since (datetime | None): начало периода (включительно).
+            until (datetime | None): конец периода (не включительно).
+
+        Returns:
+            list[dict]: список агрегатов, упорядоченных по локации и началу интервала.
+        """
+
+        if grain not in ROLLUPS:
+            raise ValueError(f"Неизвестная длительность интервала: {grain}")
+
+        table, _ = ROLLUPS[grain]
+        locations = LocationModel.__table__
+        query = select(
+            locations.c.latitude,
+            locations.c.longitude,
+            table.c.bucket,
+            table.c.observations,
+            table.c.temperature_min,
+            table.c.temperature_max,
+            table.c.temperature_sum,
+            table.c.precipitation_sum,
+            table.c.wind_speed_sum,
+        ).select_from(table.join(locations))
+
+        if location is not None:
+            latitude, longitude = location
+            query = query.where(locations.c.latitude == latitude, locations.c.longitude == longitude)
+        if since is not None:
+            query = query.where(table.c.bucket >= datetime_to_epoch(since, 0))
+        if until is not None:
+            query = query.where(table.c.bucket < datetime_to_epoch(until, 0))
+
+        query = query.order_by(table.c.location_id, table.c.bucket)
+
+        async with self.engine.connect() as conn:
+
+            result = await conn.execute(query)
+
+            return [
+                {
+                    "latitude": row.latitude,
+                    "longitude": row.longitude,
+                    "bucket": epoch_to_datetime(row.bucket, 0),
+                    "observations": row.observations,
+                    "temperature_min": row.temperature_min,
+                    "temperature_max": row.temperature_max,
+                    "temperature_avg": row.temperature_sum / row.observations,
+                    "precipitation_sum": row.precipitation_sum,
+                    "wind_speed_avg": row.wind_speed_sum / row.observations,
+                }
+                for row in result
+            ]
+
+    @staticmethod
+    def rollup_aggregate_expression(table: Table, metric: str, fn: str):
+        """Возвращает выражение агрегации показателя по столбцам таблицы агрегатов.
+
+        Args:
+            table (Table): таблица агрегатов.
+            metric (str): показатель из AGGREGATE_METRICS.
+            fn (str): функция из AGGREGATE_FUNCTIONS.
+
+        Returns:
+            выражение агрегации или None, если показатель не хранится в агрегатах.
+        """
+
+        sums = {
+            "temperature_2m": table.c.temperature_sum,
+            "precipitation": table.c.precipitation_sum,
+            "wind_speed_10m": table.c.wind_speed_sum,
+        }
+
+        if metric not in sums:
+            return None
+        if fn == "count":
+            return func.sum(table.c.observations)
+        if fn == "sum":
+            return func.sum(sums[metric])
+        if fn == "avg":
+            return func.sum(sums[metric]) / func.sum(table.c.observations)
+        if fn == "min" and metric == "temperature_2m":
+            return func.min(table.c.temperature_min)
+        if fn == "max" and metric == "temperature_2m":
+            return func.max(table.c.temperature_max)
+
+        return None
+
+    async def aggregate(
+        self,
+        metric: str,
+        fn: str = "avg",
+        bucket: str | int = "day",
+        location: tuple[float, float] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        source: str = "auto",
+    ) -> dict:
+        """Асинхронно вычисляет статистику показателя по интервалам времени средствами базы данных (GROUP BY).
+
+        Агрегаты читаются из таблиц почасовых или посуточных агрегатов, если показатель и функция в них доступны,
+        а интервал и границы периода кратны интервалу таблицы агрегатов, иначе - из записей о погоде.
+        Интервалы и границы периода без часового пояса считаются в UTC.
+
+        Args:
+            metric (str): показатель из AGGREGATE_METRICS.
+            fn (str): функция агрегации из AGGREGATE_FUNCTIONS.
+            bucket (str | int): интервал группировки ("hour", "day" или длительность в секундах).
+            location (tuple[float, float] | None): локация в виде пары (широта, долгота), None - все локации.
+            since (datetime | None): начало периода (включительно).
+            until (datetime | None): конец периода (не включительно).
+            source (str): источник данных ("auto", "raw" - записи о погоде, "rollup" - таблицы агрегатов).
+
+        Returns:
+            dict: столбцы результата: "bucket" - начала интервалов, "value" - значения статистики.
+        """
+
+        if metric not in AGGREGATE_METRICS:
+            raise ValueError(f"Неизвестный показатель: {metric}")
+        if fn not in AGGREGATE_FUNCTIONS:
+            raise ValueError(f"Неизвестная функция агрегации: {fn}")
+        if isinstance(bucket, str) and bucket not in ROLLUPS:
+            raise ValueError(f"Неизвестный интервал группировки: {bucket}")
+        if source not in AGGREGATE_SOURCES:
+            raise ValueError(f"Неизвестный источник данных: {source}")
+
+        size = ROLLUPS[bucket][1] if isinstance(bucket, str) else int(bucket)
+        if size <= 0:
+            raise ValueError(f"Интервал группировки должен быть положительным: {bucket}")
+
+        await self.refresh_partitions()
+        since_epoch = None if since is None else datetime_to_epoch(since, 0)
+        until_epoch = None if until is None else datetime_to_epoch(until, 0)
+
+        # Выбираем самую крупную таблицу агрегатов, подходящую для интервала и границ периода
+        value = None
+        if source != "raw":
+            for table, rollup_size in sorted(ROLLUPS.values(), key=lambda rollup: -rollup[1]):
+                aligned = all(
+                    epoch is None or epoch % rollup_size == 0 for epoch in (size, since_epoch, until_epoch)
+                )
+                value = self.rollup_aggregate_expression(table, metric, fn) if aligned else None
+                if value is not None:
+                    time_column = table.c.bucket
+                    break
+
+        if value is None:
+            if source == "rollup":
+                raise ValueError(f"Статистика {fn}({metric}) по интервалу {bucket} недоступна в таблицах агрегатов")
+            table = self.get_weather_source(since_epoch, until_epoch)
+            value = AGGREGATE_FUNCTIONS[fn](table.c[metric])
+            time_column = table.c.datetime_weather
+
+        start = time_column - time_column % size
+        query = select(start, value).group_by(start).order_by(start)
+
+        if location is not None:
+            latitude, longitude = location
+            locations = LocationModel.__table__
+            location_id = select(locations.c.id).where(
+                locations.c.latitude == latitude, locations.c.longitude == longitude
+            )
+            query = query.where(table.c.location_id == location_id.scalar_subquery())
+        if since_epoch is not None:
+            query = query.where(time_column >= since_epoch)
+        if until_epoch is not None:
+            query = query.where(time_column < until_epoch)
+
+        async with self.engine.connect() as conn:
+
+            result = await conn.execute(query)
+            rows = result.all()
+
+        return {
+            "bucket": [epoch_to_datetime(row[0], 0) for row in rows],
+            "value": [row[1] for row in rows],
+        }
+
+    async def get_all_weather_data(self) -> list[dict]:
+        """Асинхронно возвращает все записи о погоде из базы данных.
+
+        Returns:
+            list: список всех записей о погоде
+        """
+
+        return await self.get_weather_data()
+
+    @staticmethod
+    def select_weather_data(
+        location: tuple[float, float] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = None,
+        table: Table | None = None,
+        columns: list[str] | None = None,
+        after_id: int | None = None,
+        max_id: int | None = None,
+    ) -> Select:
+        """Формирует запрос столбцов WeatherRow с фильтрами по локации и периоду измерения.
+
+        Границы периода без часового пояса считаются заданными в UTC и сравниваются с Unix-временем измерения.
+
+        Args:
+            location (tuple[float, float] | None): локация в виде пары (широта, долгота).
+            since (datetime | None): начало периода измерения (включительно).
+            until (datetime | None): конец периода измерения (не включительно).
+            limit (int | None): максимальное количество записей.
+            table (Table | None): таблица weather_data или помесячная секция (по умолчанию weather_data).
+            columns (list[str] | None): выбираемые поля WeatherRow (по умолчанию все поля по порядку).
+            after_id (int | None): выбрать только записи с идентификатором больше указанного (поиск по первичному
+                ключу, сортируются только выбранные записи).
+            max_id (int | None): выбрать только записи с идентификатором не больше указанного.
+
+        Returns:
+            Select: запрос записей, упорядоченных по дате и времени измерения.
+        """
+
+        if table is None:
+            table = WeatherDataModel.__table__
+        locations = LocationModel.__table__
+        selected = []
+        for name in columns or WeatherRow._fields:
+            if name in ("latitude", "longitude", "timezone"):
+                selected.append(locations.c[name])
+            elif name == "valid_to":
+                selected.append(func.coalesce(table.c.valid_to, table.c.datetime_weather).label(name))
+            else:
+                selected.append(table.c[name])
+        query = select(*selected).select_from(table.join(locations, table.c.location_id == locations.c.id))
+
+        if location is not None:
+            latitude, longitude = location
+            query = query.where(locations.c.latitude == latitude, locations.c.longitude == longitude)
+        if since is not None:
+            query = query.where(table.c.datetime_weather >= datetime_to_epoch(since, 0))
+        if until is not None:
+            query = query.where(table.c.datetime_weather < datetime_to_epoch(until, 0))
+        if after_id is not None:
+            query = query.where(table.c.id > after_id)
+        if max_id is not None:
+            query = query.where(table.c.id <= max_id)
+
+        query = query.order_by(table.c.datetime_weather)
+
+        if limit is not None:
+            query = query.limit(limit)
+
+        return query
+
+    @staticmethod
+    def get_epoch_period(since: datetime | None, until: datetime | None) -> tuple[int | None, int | None]:
+        """Преобразует границы периода в Unix-время (без часового пояса - UTC).
+
+        Args:
+            since (datetime | None): начало периода.
+            until (datetime | None): конец периода.
+
+        Returns:
+            tuple[int | None, int | None]: границы периода в Unix-времени.
+        """
+
+        return (
+            None if since is None else datetime_to_epoch(since, 0),
+            None if until is None else datetime_to_epoch(until, 0),
+        )
+
+    async def get_weather_rows(
+        self,
+        location: tuple[float, float] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = None,
+        expand: bool = False,
+    ) -> list[WeatherRow]:
+        """Асинхронно возвращает записи о погоде в виде кортежей WeatherRow, минуя ORM.
+
+        Args:
+            location (tuple[float, float] | None): локация в виде пары (широта, долгота).
+            since (datetime | None): начало периода измерения (включительно).
+            until (datetime | None): конец периода измерения (не включительно).
+            limit (int | None): максимальное количество записей.
+            expand (bool): развернуть интервалы неизменных значений в отдельные измерения (expand_weather_rows);
+                limit ограничивает количество записей до разворачивания.
+
+        Returns:
+            list[WeatherRow]: список записей о погоде, упорядоченных по дате и времени измерения.
+        """
+
+        rows = []
+
+        async with self.engine.connect() as conn:
+
+            await self.refresh_partitions(conn)
+            tables = self.get_weather_tables(*self.get_epoch_period(since, until))
+
+            # Секции перебираются по порядку времени, поэтому записи остаются упорядоченными без общей сортировки
+            for table in tables:
+                remaining = None if limit is None else limit - len(rows)
+                if remaining == 0:
+                    break
+
+                result = await conn.execute(self.select_weather_data(location, since, until, remaining, table))
+                rows.extend(decode_weather_row(row) for row in result)
+
+        return expand_weather_rows(rows) if expand else rows
+
+    async def get_weather_columns(
+        self,
+        columns: list[str],
+        location: tuple[float, float] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+    ) -> dict[str, list]:
+        """Асинхронно возвращает выбранные поля записей о погоде по столбцам, читая из базы данных только их.
+
+        Args:
+            columns (list[str]): поля WeatherRow.
+            location (tuple[float, float] | None): локация в виде пары (широта, долгота).
+            since (datetime | None): начало периода измерения (включительно).
+            until (datetime | None): конец периода измерения (не включительно).
+
+        Returns:
+            dict[str, list]: значения каждого поля (категории расшифрованы, дата и время в Unix-времени).
+        """
+
+        data = {name: [] for name in columns}
+
+        async with self.engine.connect() as conn:
+
+            await self.refresh_partitions(conn)
+            for table in self.get_weather_tables(*self.get_epoch_period(since, until)):
+                query = self.select_weather_data(location, since, until, table=table, columns=columns)
+                rows = (await conn.execute(query)).all()
+                for name, values in zip(columns, zip(*rows)):
+                    data[name].extend(values)
+
+        for name, categories in (("type_precipitation", PRECIPITATION_TYPES), ("wind_direction_10m", WIND_DIRECTIONS)):
+            if name in data:
+                data[name] = [categories[code] for code in data[name]]
+
+        return data
+
+    async def delete_weather_data_before(self, before: datetime) -> None:
+        """Асинхронно удаляет записи о погоде, измеренные раньше указанного момента. Агрегаты сохраняются.
+
+        В режиме секций полностью устаревшие секции удаляются целиком. Пересчет агрегатов (rebuild_rollups)
+        не затрагивает интервалы до первой оставшейся записи, поэтому, чтобы агрегаты не пересчитывались
+        по части записей интервала, момент следует выбирать на границе суток (UTC).
+
+        Args:
+            before (datetime): момент времени (без часового пояса - UTC).
+        """
+
+        if self.partitioning:
+            await self.drop_partitions_before(before)
+        else:
+            await self.split_observation_spans(before)
+
+        before_epoch = datetime_to_epoch(before, 0)
+
+        async with self.engine.begin() as conn:
+            await self.refresh_partitions(conn)
+            for table in self.get_weather_tables(None, before_epoch):
+                await conn.execute(delete(table).where(table.c.datetime_weather < before_epoch))
+
+    async def get_weather_data(
+        self,
+        location: tuple[float, float] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = None,
+        expand: bool = False,
+    ) -> list[dict]:
+        """Асинхронно возвращает записи о погоде по локации и периоду измерения с использованием индексов.
+
+        Args:
+            location (tuple[float, float] | None): локация в виде пары (широта, долгота).
+            since (datetime | None): начало периода измерения (включительно).
+            until (datetime | None): конец периода измерения (не включительно).
+            limit (int | None): максимальное количество записей.
+            expand (bool): развернуть интервалы неизменных значений в отдельные измерения.
+
+        Returns:
+            list[dict]: список записей о погоде, упорядоченных по дате и времени измерения.
+        """
+
+        return [row.to_dict() for row in await self.get_weather_rows(location, since, until, limit, expand)]
+
+    async def iter_weather_rows(
+        self,
+        batch_size: int = 1000,
+        location: tuple[float, float] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        expand: bool = False,
+        after_id: int | None = None,
+        max_id: int | None = None,
+    ) -> AsyncIterator[list[WeatherRow]]:
+        """Асинхронно перебирает записи о погоде пакетами кортежей WeatherRow, минуя ORM.
+
+        Записи читаются потоком из курсора базы данных по batch_size строк.
+
+        Args:
+            batch_size (int): количество записей в пакете.
+            location (tuple[float, float] | None): локация в виде пары (широта, долгота).
+            since (datetime | None): начало периода измерения (включительно).
+            until (datetime | None): конец периода измерения (не включительно).
+            expand (bool): развернуть интервалы неизменных значений в отдельные измерения (пакет при этом
+                может содержать больше batch_size записей).
+            after_id (int | None): перебирать только записи с идентификатором больше указанного
+                (инкрементальная выгрузка, см. get_export_watermark).
+            max_id (int | None): перебирать только записи с идентификатором не больше указанного.
+
+        Yields:
+            list[WeatherRow]: пакет записей о погоде, упорядоченных по дате и времени измерения.
+        """
+
+        async with self.engine.connect() as conn:
+
+            await self.refresh_partitions(conn)
+            for table in self.get_weather_tables(*self.get_epoch_period(since, until)):
+                query = self.select_weather_data(
+                    location, since, until, table=table, after_id=after_id, max_id=max_id
+                )
+                result = await conn.stream(query.execution_options(yield_per=batch_size))
+
+                async for partition in result.partitions():
+                    rows = [decode_weather_row(row) for row in partition]
+                    yield expand_weather_rows(rows) if expand else rows
+
+    async def iter_weather_data_batches(
+        self,
+        batch_size: int = 1000,
+        location: tuple[float, float] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+    ) -> AsyncIterator[list[dict]]:
+        """Асинхронно перебирает записи о погоде пакетами, не загружая всю выборку в память.
+
+        Записи читаются потоком из курсора базы данных по batch_size строк.
+
+        Args:
+            batch_size (int): количество записей в пакете.
+            location (tuple[float, float] | None): локация в виде пары (широта, долгота).
+            since (datetime | None): начало периода измерения (включительно).
+            until (datetime | None): конец периода измерения (не включительно).
+
+        Yields:
+            list[dict]: пакет записей о погоде, упорядоченных по дате и времени измерения.
+        """
+
+        async for batch in self.iter_weather_rows(batch_size, location, since, until):
+            yield [row.to_dict() for row in batch]
+
+    async def iter_weather_data(
+        self,
+        location: tuple[float, float] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[dict]:
+        """Асинхронно перебирает записи о погоде по одной, не загружая всю выборку в память.
+
+        Args:
+            location (tuple[float, float] | None): локация в виде пары (широта, долгота).
+            since (datetime | None): начало периода измерения (включительно).
+            until (datetime | None): конец периода измерения (не включительно).
+            batch_size (int): количество записей, читаемых из базы данных за один раз.
+
+        Yields:
+            dict: запись о погоде.
+        """
+
+        async for batch in self.iter_weather_data_batches(batch_size, location, since, until):
+            for item in batch:
+                yield item
+
+    async def get_last_weather_id(self) -> int:
+        """Асинхронно возвращает наибольший идентификатор сохраненной записи о погоде (по первичному ключу).
+
+        Returns:
+            int: идентификатор последней записи или 0, если записей нет.
+        """
+
+        async with self.engine.connect() as conn:
+            await self.refresh_partitions(conn)
+            last_ids = [
+                await conn.scalar(select(func.max(table.c.id))) for table in self.get_weather_tables()
+            ]
+
+        return max(filter(None, last_ids), default=0)
+
+    async def get_export_watermark(self, target: str) -> int:
+        """Асинхронно возвращает отметку инкрементальной выгрузки получателя.
+
+        Args:
+            target (str): получатель выгрузки.
+
+        Returns:
+            int: идентификатор последней выгруженной записи или 0, если выгрузок еще не было.
+        """
+
+        table = ExportWatermarkModel.__table__
+
+        async with self.engine.connect() as conn:
+            last_id = await conn.scalar(select(table.c.last_id).where(table.c.target == target))
+
+        return last_id or 0
+
+    async def set_export_watermark(self, target: str, last_id: int) -> None:
+        """Асинхронно сохраняет отметку инкрементальной выгрузки получателя.
+
+        Args:
+            target (str): получатель выгрузки.
+            last_id (int): идентификатор последней выгруженной записи.
+        """
+
+        table = ExportWatermarkModel.__table__
+        query = self.dialect_insert(table).values(target=target, last_id=last_id)
+        query = query.on_conflict_do_update(index_elements=[table.c.target], set_={"last_id": query.excluded.last_id})
+
+        async with self.engine.begin() as conn:
+            await conn.execute(query)
@@ -1,54 +1,129 @@
 import asyncio
-from datetime import datetime
+import json
+from collections.abc import AsyncIterator, Iterable
+from pathlib import Path
 
 import openpyxl
-from openpyxl.utils import get_column_letter
 
+from .DB_manager import WeatherRow
+from .Export_manager import BaseExporter, ExportJob
 
-class ExcelManager:
-    """Класс-менеджер для работы с Excel."""
+# Максимальное количество строк листа xlsx, включая строку заголовков
+EXCEL_MAX_SHEET_ROWS = 1048576
 
-    def __init__(self) -> None:
-        """Инициализация менеджера excel."""
+# Способы разбиения выгрузки при превышении лимита строк: новый лист той же книги или новый файл
+SPLIT_MODES = ("sheet", "file")
 
+
+class ExcelManager(BaseExporter):
+    """Класс-менеджер для работы с Excel.
+
+    Файл создается в режиме только для записи (write_only): строки добавляются в лист по порядку и сразу
+    сериализуются, поэтому расход памяти не зависит от количества строк. Файл сохраняется один раз методом save.
+    Заполнение листа и сохранение файла выполняются в отдельном потоке, не блокируя цикл событий.
+
+    Когда на листе набирается max_rows записей, выгрузка продолжается на новом листе или в новом файле (split),
+    а при сохранении рядом с первым файлом записывается манифест частей в формате JSON.
+    """
+
+    # Номер столбца даты и времени измерения (для периода частей в манифесте)
+    DATETIME_WEATHER_COLUMN = BaseExporter.HEADERS.index("Дата и время измерения погоды")
+
+    EXTENSION = ".xlsx"
+    WATERMARK_TARGET = "excel"
+
+    def __init__(self, max_rows: int = EXCEL_MAX_SHEET_ROWS - 1, split: str = "sheet") -> None:
+        """Инициализация менеджера excel.
+
+        Args:
+            max_rows (int): максимальное количество записей на листе (без строки заголовков).
+            split (str): продолжение выгрузки при заполнении листа: sheet - новый лист, file - новый файл.
+        """
+
+        if not 0 < max_rows < EXCEL_MAX_SHEET_ROWS:
+            raise ValueError(f"Количество записей на листе должно быть от 1 до {EXCEL_MAX_SHEET_ROWS - 1}.")
+        if split not in SPLIT_MODES:
+            raise ValueError(f"Неизвестный способ разбиения выгрузки: {split}. Допустимые значения: {SPLIT_MODES}.")
+
+        self.max_rows = max_rows
+        self.split = split
         self.workbook = None
         self.sheet = None
         self.file_name = None
+        self.rows_written = 0
+        self.sheet_rows = 0  # Количество записей на текущем листе
+        self.parts = []  # Части выгрузки: файл, лист, количество записей и период измерения
 
     async def create_excel_file(self) -> None:
         """Асинхронно создает новый файл Excel с заголовками столбцов."""
 
         self.file_name = self.create_filename()
+        self.open_workbook()
+
+        await asyncio.sleep(0)
 
-        self.workbook = openpyxl.Workbook()
-        self.sheet = self.workbook.active
-        self.sheet.title = "Weather Data"
-
-        # Заголовки для столбцов
-        headers = [
-            "№",
-            "Широта",
-            "Долгота",
-            "Часовой пояс",
-            "Смещение часового пояса",
-            "Дата и время запроса данных",
-            "Дата и время измерения погоды",
-            "Температура воздуха (°C)",
-            "Количество осадков (мм)",
-            "Тип осадков",
-            "Атмосферное давление (мм рт.ст.)",
-            "Скорость ветра (m/s)",
-            "Направление ветра",
-        ]
+    def open_workbook(self) -> None:
+        """Создает книгу с листом данных и строкой заголовков для файла file_name."""
+
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.rows_written = 0
+        self.parts = []
+        self.add_sheet()
+
+    def add_sheet(self) -> None:
+        """Добавляет в книгу новый лист данных со строкой заголовков и открывает новую часть выгрузки."""
+
+        sheets = sum(part["file"] == self.file_name for part in self.parts)
+        title = "Weather Data" if not sheets else f"Weather Data {sheets + 1}"
+
+        self.sheet = self.workbook.create_sheet(title)
+        self.sheet_rows = 0
+        self.parts.append(
+            {
+                "file": self.file_name,
+                "sheet": title,
+                "rows": 0,
+                "datetime_weather_from": None,  # Дата и время измерения первой записи части
+                "datetime_weather_to": None,  # Дата и время измерения последней записи части
+            }
+        )
 
         # Заполняем первую строку заголовками
-        for col_num, header in enumerate(headers, 1):
-            column_letter = get_column_letter(col_num)
-            self.sheet[f"{column_letter}1"] = header
+        self.sheet.append(self.HEADERS)
 
-        await asyncio.sleep(0)
+    def roll_over(self) -> None:
+        """Продолжает выгрузку на новом листе или в новом файле, когда текущий лист заполнен."""
+
+        if self.split == "sheet":
+            self.add_sheet()
+            return
 
         self.workbook.save(self.file_name)
+        first = Path(self.parts[0]["file"])
+        self.file_name = str(first.with_name(f"{first.stem}_{len(self.parts) + 1}{first.suffix}"))
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.add_sheet()
+
+    def append_values(self, values: Iterable[list]) -> None:
+        """Добавляет строки ячеек в лист, переходя на новый лист или файл при заполнении текущего.
+
+        Args:
+            values (Iterable[list]): значения ячеек строк в порядке HEADERS.
+        """
+
+        part = self.parts[-1]
+        for row in values:
+            if self.sheet_rows == self.max_rows:
+                self.roll_over()
+                part = self.parts[-1]
+
+            self.sheet.append(row)
+            self.sheet_rows += 1
+            part["rows"] += 1
+            if part["datetime_weather_from"] is None:
+                part["datetime_weather_from"] = row[self.DATETIME_WEATHER_COLUMN]
+            part["datetime_weather_to"] = row[self.DATETIME_WEATHER_COLUMN]
+            self.rows_written += 1
 
     async def add_weather_data_to_excel(self, weather_data: list[dict]) -> None:
         """Асинхронно добавляет данные о погоде в Excel-файл.
@@ -60,42 +135,165 @@ class ExcelManager:
         if not self.workbook or not self.sheet:
             raise ValueError("Файл Excel не был создан.")
 
-        # Стартовая строка для добавления данных
-        start_row = self.sheet.max_row + 1
-
-        for row_num, data in enumerate(weather_data, start=start_row):
-            self.sheet[f"A{row_num}"] = data.get("id")
-            self.sheet[f"B{row_num}"] = data.get("latitude")
-            self.sheet[f"C{row_num}"] = data.get("longitude")
-            self.sheet[f"D{row_num}"] = data.get("timezone")
-            self.sheet[f"E{row_num}"] = data.get("utc_offset_seconds")
-            self.sheet[f"F{row_num}"] = (
-                data.get("datetime_request").strftime("%Y-%m-%d %H:%M:%S")
-                if isinstance(data.get("datetime_request"), datetime)
-                else data.get("datetime_request")
-            )
-            self.sheet[f"G{row_num}"] = (
-                data.get("datetime_weather").strftime("%Y-%m-%d %H:%M:%S")
-                if isinstance(data.get("datetime_weather"), datetime)
-                else data.get("datetime_weather")
-            )
-            self.sheet[f"H{row_num}"] = data.get("temperature_2m")
-            self.sheet[f"I{row_num}"] = data.get("precipitation")
-            self.sheet[f"J{row_num}"] = data.get("type_precipitation")
-            self.sheet[f"K{row_num}"] = data.get("pressure_msl")
-            self.sheet[f"L{row_num}"] = data.get("wind_speed_10m")
-            self.sheet[f"M{row_num}"] = data.get("wind_direction_10m")
-
-        # Сохраняем изменения в файле
+        await asyncio.to_thread(self.append_weather_data, weather_data)
+
+    def append_weather_data(self, weather_data: list[dict]) -> None:
+        """Добавляет данные о погоде в лист (выполняется в отдельном потоке).
+
+        Args:
+            weather_data (list[dict]): список данных о погоде для записи в файл.
+        """
+
+        self.append_values(map(self.weather_data_values, weather_data))
+
+    async def add_weather_rows_to_excel(self, rows: list[WeatherRow]) -> None:
+        """Асинхронно добавляет записи о погоде в виде кортежей WeatherRow в Excel-файл, минуя словари.
+
+        Args:
+            rows (list[WeatherRow]): записи о погоде для записи в файл.
+        """
+
+        if not self.workbook or not self.sheet:
+            raise ValueError("Файл Excel не был создан.")
+
+        await asyncio.to_thread(self.append_weather_rows, rows)
+
+    def append_weather_rows(self, rows: list[WeatherRow]) -> None:
+        """Добавляет записи о погоде в лист (выполняется в отдельном потоке).
+
+        Args:
+            rows (list[WeatherRow]): записи о погоде для записи в файл.
+        """
+
+        self.append_values(map(self.weather_row_values, rows))
+
+    async def save(self) -> str:
+        """Асинхронно сохраняет Excel-файл. Файл в режиме только для записи сохраняется один раз.
+
+        Returns:
+            str: имя сохраненного файла или, если выгрузка разбита на несколько частей, имя манифеста частей.
+        """
+
+        if not self.workbook:
+            raise ValueError("Файл Excel не был создан.")
+
+        return await asyncio.to_thread(self.save_parts)
+
+    def save_parts(self) -> str:
+        """Сохраняет текущий файл и, если выгрузка разбита на несколько частей, манифест частей.
+
+        Returns:
+            str: имя сохраненного файла или имя манифеста частей.
+        """
+
         self.workbook.save(self.file_name)
-        await asyncio.sleep(0)
+        self.workbook = None
+        self.sheet = None
+
+        parts, self.parts = self.parts, []
+        if len(parts) == 1:
+            return self.file_name
+
+        return self.write_manifest(parts)
+
+    def write_manifest(self, parts: list[dict]) -> str:
+        """Записывает манифест частей выгрузки рядом с ее первым файлом.
+
+        Args:
+            parts (list[dict]): части выгрузки.
+
+        Returns:
+            str: имя файла манифеста.
+        """
+
+        manifest_name = str(Path(parts[0]["file"]).with_suffix(".manifest.json"))
+        manifest = {
+            "rows": sum(part["rows"] for part in parts),
+            "max_rows": self.max_rows,
+            "split": self.split,
+            "parts": parts,
+        }
+
+        with open(manifest_name, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, ensure_ascii=False, indent=2)
+
+        return manifest_name
+
+    async def export_weather_rows(self, batches: AsyncIterator[list[WeatherRow]]) -> str:
+        """Асинхронно выгружает записи о погоде из итератора пакетов в новый Excel-файл.
+
+        Пакеты записываются в лист по мере чтения из базы данных, поэтому в памяти находится не больше одного пакета.
+
+        Args:
+            batches (AsyncIterator[list[WeatherRow]]): пакеты записей о погоде (например, DBManager.iter_weather_rows).
+
+        Returns:
+            str: имя сохраненного файла.
+        """
+
+        await self.create_excel_file()
+
+        async for rows in batches:
+            await self.add_weather_rows_to_excel(rows)
+
+        return await self.save()
+
+    def start_export(self, batches: AsyncIterator[list[WeatherRow]], name_suffix: str = "") -> ExportJob:
+        """Запускает выгрузку записей о погоде в новый Excel-файл в отдельном процессе.
+
+        Args:
+            batches (AsyncIterator[list[WeatherRow]]): пакеты записей о погоде (например, DBManager.iter_weather_rows).
+            name_suffix (str): дополнение к имени файла после даты и времени.
+
+        Returns:
+            ExportJob: дескриптор выгрузки, который можно ожидать (await job) для получения имени файла
+                (или манифеста частей).
+        """
+
+        # В рабочий процесс передается новый менеджер с теми же настройками, без открытой книги
+        return ExportJob(batches, ExcelManager(self.max_rows, self.split), name_suffix)
 
     @staticmethod
-    def create_filename() -> str:
-        """Создаёт имя файла с текущей датой и временем.
+    def remove_files(file_name: str) -> None:
+        """Удаляет файлы прерванной выгрузки: первый файл, следующие части и манифест.
+
+        Args:
+            file_name (str): имя первого файла выгрузки.
+        """
+
+        first = Path(file_name)
+        first.unlink(missing_ok=True)
+        first.with_suffix(".manifest.json").unlink(missing_ok=True)
+
+        number = 2
+        while (part := first.with_name(f"{first.stem}_{number}{first.suffix}")).exists():
+            part.unlink()
+            number += 1
+
+    def open(self, file_name: str) -> None:
+        """Создает книгу для файла file_name (выгрузка в рабочем процессе, см. ExportJob).
+
+        Args:
+            file_name (str): имя файла.
+        """
+
+        self.file_name = file_name
+        self.open_workbook()
+
+    def write_rows(self, rows: list[WeatherRow]) -> None:
+        """Добавляет пакет записей о погоде в лист (выгрузка в рабочем процессе, см. ExportJob).
+
+        Args:
+            rows (list[WeatherRow]): записи о погоде.
+        """
+
+        self.append_weather_rows(rows)
+
+    def close(self) -> str:
+        """Сохраняет книгу (выгрузка в рабочем процессе, см. ExportJob).
 
         Returns:
-            str: Имя файла с меткой времени.
+            str: имя сохраненного файла или манифеста частей.
         """
 
-        return f"weather_data_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx"
+        return self.save_parts()
@@ -0,0 +1,597 @@
+import asyncio
+import csv
+import gzip
+import json
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import TextIO
+
+from .DB_manager import DBManager, WeatherRow, epoch_to_datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Выгрузка в Parquet доступна только при установленном пакете pyarrow
+    pa = pq = None
+
+
+class BaseExporter(ABC):
+    """Базовый класс потоковой выгрузки записей о погоде в файл.
+
+    Наследники открывают файл (open), дописывают в него пакеты записей (write_rows) и закрывают его (close).
+    Заголовки столбцов и преобразование записей в значения ячеек общие для всех форматов. Выгрузка выполняется
+    в отдельном рабочем процессе (см. ExportJob), в памяти находится не больше одного пакета записей.
+    """
+
+    # Заголовки для столбцов
+    HEADERS = [
+        "№",
+        "Широта",
+        "Долгота",
+        "Часовой пояс",
+        "Смещение часового пояса",
+        "Дата и время запроса данных",
+        "Дата и время измерения погоды",
+        "Температура воздуха (°C)",
+        "Количество осадков (мм)",
+        "Тип осадков",
+        "Атмосферное давление (мм рт.ст.)",
+        "Скорость ветра (m/s)",
+        "Направление ветра",
+    ]
+
+    # Расширение имени файла выгрузки
+    EXTENSION = ""
+
+    # Получатель инкрементальной выгрузки (ключ отметки в базе данных)
+    WATERMARK_TARGET = ""
+
+    @abstractmethod
+    def open(self, file_name: str) -> None:
+        """Создает файл выгрузки и записывает в него заголовки столбцов.
+
+        Args:
+            file_name (str): имя файла.
+        """
+
+    @abstractmethod
+    def write_rows(self, rows: list[WeatherRow]) -> None:
+        """Дописывает пакет записей о погоде в файл выгрузки.
+
+        Args:
+            rows (list[WeatherRow]): записи о погоде.
+        """
+
+    @abstractmethod
+    def close(self) -> str:
+        """Завершает запись и закрывает файл выгрузки.
+
+        Returns:
+            str: имя сохраненного файла.
+        """
+
+    def start_export(self, batches: AsyncIterator[list[WeatherRow]], name_suffix: str = "") -> "ExportJob":
+        """Запускает выгрузку записей о погоде в новый файл в отдельном процессе.
+
+        Args:
+            batches (AsyncIterator[list[WeatherRow]]): пакеты записей о погоде (например, DBManager.iter_weather_rows).
+            name_suffix (str): дополнение к имени файла после даты и времени.
+
+        Returns:
+            ExportJob: дескриптор выгрузки, который можно ожидать (await job) для получения имени файла.
+        """
+
+        return ExportJob(batches, self, name_suffix)
+
+    async def export_new_weather_rows(self, db_manager: DBManager, target: str | None = None) -> str | None:
+        """Асинхронно выгружает в новый файл только записи, сохраненные после предыдущей выгрузки получателя.
+
+        Записи выбираются по первичному ключу (id больше отметки), поэтому стоимость выгрузки зависит от количества
+        новых записей, а не от размера таблицы. Отметка сдвигается только после сохранения файла: при ошибке
+        следующая выгрузка повторит те же записи.
+
+        Верхняя граница идентификаторов фиксируется до начала выгрузки. Секции читаются отдельными запросами,
+        и запись, сохраненная во время выгрузки в уже прочитанную секцию, не попала бы в файл, а отметка по наибольшему
+        прочитанному идентификатору пропустила бы ее и в следующих выгрузках. Диапазон выгружаемых идентификаторов
+        входит в имя файла: выгрузки, выполненные в одну секунду, не перезаписывают друг друга.
+
+        Args:
+            db_manager (DBManager): менеджер базы данных.
+            target (str | None): получатель выгрузки, для которого хранится отметка (по умолчанию WATERMARK_TARGET).
+
+        Returns:
+            str | None: имя сохраненного файла или None, если новых записей нет.
+        """
+
+        target = target or self.WATERMARK_TARGET
+        watermark = await db_manager.get_export_watermark(target)
+        last_id = await db_manager.get_last_weather_id()
+        if last_id <= watermark:
+            return None
+
+        file_name = await self.start_export(
+            db_manager.iter_weather_rows(after_id=watermark, max_id=last_id), f"_ids_{watermark + 1}-{last_id}"
+        )
+        await db_manager.set_export_watermark(target, last_id)
+
+        return file_name
+
+    @classmethod
+    def weather_data_values(cls, data: dict) -> list:
+        """Возвращает значения ячеек строки для словаря с данными о погоде.
+
+        Args:
+            data (dict): словарь с данными о погоде.
+
+        Returns:
+            list: значения ячеек в порядке HEADERS.
+        """
+
+        return [
+            data.get("id"),
+            data.get("latitude"),
+            data.get("longitude"),
+            data.get("timezone"),
+            data.get("utc_offset_seconds"),
+            cls.format_datetime(data.get("datetime_request")),
+            cls.format_datetime(data.get("datetime_weather")),
+            data.get("temperature_2m"),
+            data.get("precipitation"),
+            data.get("type_precipitation"),
+            data.get("pressure_msl"),
+            data.get("wind_speed_10m"),
+            data.get("wind_direction_10m"),
+        ]
+
+    @classmethod
+    def weather_row_values(cls, row: WeatherRow) -> list:
+        """Возвращает значения ячеек строки для записи о погоде WeatherRow.
+
+        Args:
+            row (WeatherRow): запись о погоде.
+
+        Returns:
+            list: значения ячеек в порядке HEADERS.
+        """
+
+        return [
+            row.id,
+            row.latitude,
+            row.longitude,
+            row.timezone,
+            row.utc_offset_seconds,
+            cls.format_datetime(epoch_to_datetime(row.datetime_request)),
+            cls.format_datetime(epoch_to_datetime(row.datetime_weather, row.utc_offset_seconds)),
+            row.temperature_2m,
+            row.precipitation,
+            row.type_precipitation,
+            row.pressure_msl,
+            row.wind_speed_10m,
+            row.wind_direction_10m,
+        ]
+
+    @staticmethod
+    def format_datetime(value: datetime | None) -> str | None:
+        """Форматирует дату и время для ячейки.
+
+        Args:
+            value (datetime | None): дата и время.
+
+        Returns:
+            str | None: дата и время в формате ГГГГ-ММ-ДД чч:мм:сс или исходное значение, если это не datetime.
+        """
+
+        # isoformat с точностью до секунд совпадает с "%Y-%m-%d %H:%M:%S" и работает быстрее strftime
+        return value.isoformat(sep=" ", timespec="seconds") if isinstance(value, datetime) else value
+
+    @staticmethod
+    def remove_files(file_name: str) -> None:
+        """Удаляет файлы прерванной выгрузки.
+
+        Args:
+            file_name (str): имя файла выгрузки.
+        """
+
+        Path(file_name).unlink(missing_ok=True)
+
+    @classmethod
+    def create_filename(cls, suffix: str = "") -> str:
+        """Создаёт имя файла с текущей датой и временем.
+
+        Args:
+            suffix (str): дополнение к имени после даты и времени.
+
+        Returns:
+            str: Имя файла с меткой времени.
+        """
+
+        return f"weather_data_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}{suffix}{cls.EXTENSION}"
+
+    @classmethod
+    def reserve_filename(cls, suffix: str = "") -> str:
+        """Создает пустой файл выгрузки с новым именем и возвращает это имя.
+
+        Файл создается в режиме исключительного создания, поэтому две выгрузки не получат один и тот же файл:
+        если имя с текущей датой и временем уже занято, к нему добавляется порядковый номер.
+
+        Args:
+            suffix (str): дополнение к имени после даты и времени.
+
+        Returns:
+            str: имя созданного файла.
+        """
+
+        file_name, number = cls.create_filename(suffix), 1
+        while True:
+            try:
+                with open(file_name, "x"):
+                    return file_name
+            except FileExistsError:
+                number += 1
+                file_name = cls.create_filename(f"{suffix}({number})")
+
+
+class CsvExporter(BaseExporter):
+    """Потоковая выгрузка записей о погоде в файл CSV (UTF-8, разделитель - запятая)."""
+
+    EXTENSION = ".csv"
+    WATERMARK_TARGET = "csv"
+
+    def __init__(self) -> None:
+        """Инициализация выгрузки."""
+
+        self.file_name = None
+        self.file = None
+        self.writer = None
+
+    def open_file(self, file_name: str) -> TextIO:
+        """Открывает текстовый файл выгрузки для записи.
+
+        Args:
+            file_name (str): имя файла.
+
+        Returns:
+            TextIO: файловый объект.
+        """
+
+        return open(file_name, "w", newline="", encoding="utf-8")
+
+    def open(self, file_name: str) -> None:
+        """Создает файл CSV и записывает в него строку заголовков.
+
+        Args:
+            file_name (str): имя файла.
+        """
+
+        self.file_name = file_name
+        self.file = self.open_file(file_name)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.HEADERS)
+
+    def write_rows(self, rows: list[WeatherRow]) -> None:
+        """Дописывает пакет записей о погоде строками CSV.
+
+        Args:
+            rows (list[WeatherRow]): записи о погоде.
+        """
+
+        self.writer.writerows(map(self.weather_row_values, rows))
+
+    def close(self) -> str:
+        """Закрывает файл CSV.
+
+        Returns:
+            str: имя сохраненного файла.
+        """
+
+        self.file.close()
+        self.file = None
+        self.writer = None
+
+        return self.file_name
+
+
+class GzipCsvExporter(CsvExporter):
+    """Потоковая выгрузка записей о погоде в сжатый gzip файл CSV."""
+
+    EXTENSION = ".csv.gz"
+    WATERMARK_TARGET = "csv.gz"
+
+    def __init__(self, compresslevel: int = 6) -> None:
+        """Инициализация выгрузки.
+
+        Args:
+            compresslevel (int): степень сжатия gzip (1 - быстрее, 9 - меньше файл).
+        """
+
+        super().__init__()
+        self.compresslevel = compresslevel
+
+    def open_file(self, file_name: str) -> TextIO:
+        """Открывает сжатый gzip текстовый файл выгрузки для записи.
+
+        Args:
+            file_name (str): имя файла.
+
+        Returns:
+            TextIO: файловый объект.
+        """
+
+        return gzip.open(file_name, "wt", compresslevel=self.compresslevel, newline="", encoding="utf-8")
+
+
+class JsonlExporter(BaseExporter):
+    """Потоковая выгрузка записей о погоде в файл JSON Lines: одна запись - один объект с ключами HEADERS."""
+
+    EXTENSION = ".jsonl"
+    WATERMARK_TARGET = "jsonl"
+
+    def __init__(self) -> None:
+        """Инициализация выгрузки."""
+
+        self.file_name = None
+        self.file = None
+
+    def open(self, file_name: str) -> None:
+        """Создает файл JSON Lines.
+
+        Args:
+            file_name (str): имя файла.
+        """
+
+        self.file_name = file_name
+        self.file = open(file_name, "w", encoding="utf-8")
+
+    def write_rows(self, rows: list[WeatherRow]) -> None:
+        """Дописывает пакет записей о погоде строками JSON.
+
+        Args:
+            rows (list[WeatherRow]): записи о погоде.
+        """
+
+        headers = self.HEADERS
+        self.file.writelines(
+            json.dumps(dict(zip(headers, self.weather_row_values(row))), ensure_ascii=False) + "\n" for row in rows
+        )
+
+    def close(self) -> str:
+        """Закрывает файл JSON Lines.
+
+        Returns:
+            str: имя сохраненного файла.
+        """
+
+        self.file.close()
+        self.file = None
+
+        return self.file_name
+
+
+class ParquetExporter(BaseExporter):
+    """Потоковая выгрузка записей о погоде в файл Parquet: каждый пакет записей - отдельная группа строк."""
+
+    EXTENSION = ".parquet"
+    WATERMARK_TARGET = "parquet"
+
+    def __init__(self, compression: str = "zstd") -> None:
+        """Инициализация выгрузки.
+
+        Args:
+            compression (str): алгоритм сжатия столбцов (zstd, snappy, gzip или none).
+        """
+
+        if pa is None:
+            raise ImportError("Для выгрузки в Parquet требуется пакет pyarrow: pip install pyarrow")
+
+        self.compression = compression
+        self.file_name = None
+        self.writer = None
+
+    @classmethod
+    def get_schema(cls) -> "pa.Schema":
+        """Возвращает схему файла: столбцы HEADERS с типами значений ячеек.
+
+        Returns:
+            pa.Schema: схема файла Parquet.
+        """
+
+        types = [
+            pa.int64(),
+            pa.float64(),
+            pa.float64(),
+            pa.string(),
+            pa.int32(),
+            pa.string(),
+            pa.string(),
+            pa.float64(),
+            pa.float64(),
+            pa.string(),
+            pa.float64(),
+            pa.float64(),
+            pa.string(),
+        ]
+
+        return pa.schema(list(zip(cls.HEADERS, types)))
+
+    def open(self, file_name: str) -> None:
+        """Создает файл Parquet со схемой get_schema.
+
+        Args:
+            file_name (str): имя файла.
+        """
+
+        self.file_name = file_name
+        self.writer = pq.ParquetWriter(file_name, self.get_schema(), compression=self.compression)
+
+    def write_rows(self, rows: list[WeatherRow]) -> None:
+        """Дописывает пакет записей о погоде отдельной группой строк.
+
+        Args:
+            rows (list[WeatherRow]): записи о погоде.
+        """
+
+        if not rows:
+            return
+
+        schema = self.writer.schema
+        columns = zip(*map(self.weather_row_values, rows))
+        arrays = [pa.array(values, field.type) for values, field in zip(columns, schema)]
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    def close(self) -> str:
+        """Записывает метаданные и закрывает файл Parquet.
+
+        Returns:
+            str: имя сохраненного файла.
+        """
+
+        self.writer.close()
+        self.writer = None
+
+        return self.file_name
+
+
+# Форматы выгрузки, доступные для выбора в меню (выгрузка в Excel - ExcelManager)
+EXPORT_FORMATS = {
+    "csv": CsvExporter,
+    "csv.gz": GzipCsvExporter,
+    "jsonl": JsonlExporter,
+    "parquet": ParquetExporter,
+}
+
+
+def get_exporter(export_format: str) -> BaseExporter:
+    """Создает выгрузку в указанном формате.
+
+    Args:
+        export_format (str): формат выгрузки (ключ EXPORT_FORMATS).
+
+    Returns:
+        BaseExporter: выгрузка.
+    """
+
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Неизвестный формат выгрузки: {export_format}. Допустимые значения: {tuple(EXPORT_FORMATS)}.")
+
+    return EXPORT_FORMATS[export_format]()
+
+
+# Выгрузка в рабочем процессе (см. ExportJob)
+worker_exporter = None
+
+
+def open_worker_exporter(exporter: BaseExporter, file_name: str) -> None:
+    """Открывает файл выгрузки в рабочем процессе.
+
+    Args:
+        exporter (BaseExporter): выгрузка (в рабочий процесс передается ее копия).
+        file_name (str): имя файла.
+    """
+
+    global worker_exporter
+
+    worker_exporter = exporter
+    worker_exporter.open(file_name)
+
+
+def write_worker_rows(rows: list[WeatherRow]) -> None:
+    """Дописывает записи о погоде в файл выгрузки рабочего процесса.
+
+    Args:
+        rows (list[WeatherRow]): записи о погоде.
+    """
+
+    worker_exporter.write_rows(rows)
+
+
+def close_worker_exporter() -> str:
+    """Закрывает файл выгрузки рабочего процесса.
+
+    Returns:
+        str: имя сохраненного файла.
+    """
+
+    return worker_exporter.close()
+
+
+class ExportJob:
+    """Дескриптор фоновой выгрузки в файл.
+
+    Файл заполняется и сохраняется в отдельном рабочем процессе: сериализация записей занимает процессор и в потоке
+    конкурировала бы с циклом событий за GIL. Основной процесс только читает пакеты из базы данных и передает их
+    в рабочий процесс, причем чтение следующего пакета совмещается с записью предыдущего.
+    """
+
+    def __init__(self, batches: AsyncIterator[list[WeatherRow]], exporter: BaseExporter, name_suffix: str = "") -> None:
+        """Инициализация дескриптора и запуск выгрузки.
+
+        Имя файла резервируется в основном процессе до запуска выгрузки (BaseExporter.reserve_filename), поэтому
+        одновременные выгрузки, в том числе разных пунктов меню, пишут в разные файлы.
+
+        Args:
+            batches (AsyncIterator[list[WeatherRow]]): пакеты записей о погоде.
+            exporter (BaseExporter): выгрузка, еще не открытая (в рабочий процесс передается ее копия).
+            name_suffix (str): дополнение к имени файла после даты и времени.
+        """
+
+        self.exporter = exporter
+        self.file_name = exporter.reserve_filename(name_suffix)
+        self.rows_written = 0  # Количество записей, переданных в файл
+        self.task = asyncio.create_task(self.run(batches))
+
+    async def run(self, batches: AsyncIterator[list[WeatherRow]]) -> str:
+        """Асинхронно выполняет выгрузку.
+
+        Args:
+            batches (AsyncIterator[list[WeatherRow]]): пакеты записей о погоде.
+
+        Returns:
+            str: имя сохраненного файла.
+        """
+
+        loop = asyncio.get_running_loop()
+
+        # Завершение рабочего процесса ожидается в потоке: shutdown(wait=True) в цикле событий остановил бы его
+        # до окончания записи текущего пакета
+        executor = ProcessPoolExecutor(max_workers=1)
+        try:
+            await loop.run_in_executor(executor, open_worker_exporter, self.exporter, self.file_name)
+
+            appending = None
+            async for rows in batches:
+                if appending is not None:
+                    await appending
+                appending = loop.run_in_executor(executor, write_worker_rows, rows)
+                self.rows_written += len(rows)
+
+            if appending is not None:
+                await appending
+            file_name = await loop.run_in_executor(executor, close_worker_exporter)
+        except BaseException:
+            # При отмене или ошибке пакеты в очереди не записываются, а недописанные файлы удаляются после
+            # завершения рабочего процесса; повторный вызов shutdown не ждал бы его завершения
+            await asyncio.to_thread(executor.shutdown, cancel_futures=True)
+            self.exporter.remove_files(self.file_name)
+            raise
+
+        await asyncio.to_thread(executor.shutdown)
+
+        return file_name
+
+    def done(self) -> bool:
+        """Возвращает True, если выгрузка завершена (успешно, с ошибкой или отменена)."""
+
+        return self.task.done()
+
+    def cancel(self) -> None:
+        """Отменяет выгрузку."""
+
+        self.task.cancel()
+
+    def __await__(self):
+        """Ожидание выгрузки возвращает имя сохраненного файла."""
+
+        return self.task.__await__()
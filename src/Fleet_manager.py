@@ -0,0 +1,130 @@
+import asyncio
+import time
+from dataclasses import dataclass
+
+import httpx
+
+from .API_manager import APIManager
+from .Buffer_manager import BufferManager
+from .DB_manager import DBManager
+
+
+class TokenBucket:
+    """Глобальный ограничитель частоты запросов по алгоритму "token bucket"."""
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        """Инициализация ограничителя.
+
+        Args:
+            rate (float): скорость пополнения (запросов в секунду).
+            capacity (int): максимальное количество запросов, которое можно отправить без ожидания.
+        """
+
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Асинхронно ожидает появления свободного токена и забирает его."""
+
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass
+class CycleStats:
+    """Статистика одного цикла опроса."""
+
+    completed: int = 0  # Количество успешно опрошенных и сохраненных локаций
+    failed: int = 0  # Количество локаций, опрос или сохранение которых завершились ошибкой
+    skipped: int = 0  # Количество локаций без новых данных (данные в кэше еще актуальны)
+    requests: int = 0  # Количество отправленных запросов
+    wall_time: float = 0.0  # Длительность цикла (с)
+
+
+class FleetManager:
+    """Класс-менеджер для параллельного опроса погоды по множеству локаций."""
+
+    def __init__(
+        self,
+        weather_api: APIManager,
+        db_manager: DBManager | BufferManager,
+        locations: list[tuple[float, float]],
+        max_concurrency: int = 10,
+        rate: float = 10.0,
+        burst: int = 10,
+    ) -> None:
+        """Инициализация менеджера опроса локаций.
+
+        Args:
+            weather_api (APIManager): менеджер api.
+            db_manager (DBManager | BufferManager): менеджер базы данных или буфер отложенной записи.
+            locations (list[tuple[float, float]]): реестр локаций в виде пар (широта, долгота).
+            max_concurrency (int): максимальное количество одновременных запросов.
+            rate (float): максимальная частота запросов (запросов в секунду).
+            burst (int): максимальное количество запросов, отправляемых без ожидания.
+        """
+
+        self.weather_api = weather_api
+        self.db_manager = db_manager
+        self.locations = locations
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.rate_limiter = TokenBucket(rate, burst)
+
+    async def fetch_and_store_chunk(self, chunk: list[tuple[float, float]], stats: CycleStats) -> None:
+        """Асинхронно запрашивает данные о погоде для части локаций и сохраняет их в базу данных.
+
+        Args:
+            chunk (list[tuple[float, float]]): часть реестра локаций, помещающаяся в один запрос.
+            stats (CycleStats): статистика текущего цикла.
+        """
+
+        async with self.semaphore:
+            await self.rate_limiter.acquire()
+            stats.requests += 1
+
+            try:
+                data = await self.weather_api.get_weather_data_chunk(chunk, only_new=True)
+                await self.db_manager.add_weather_data_many(data)
+            except httpx.HTTPStatusError as e:
+                print(f"Ошибка HTTP при опросе {len(chunk)} локаций: {e.response.status_code}")
+                stats.failed += len(chunk)
+            except Exception as e:
+                print(f"Ошибка при получении или сохранении данных для {len(chunk)} локаций: {e}")
+                stats.failed += len(chunk)
+            else:
+                stats.completed += len(data)
+                stats.skipped += len(chunk) - len(data)
+
+    async def run_cycle(self) -> CycleStats:
+        """Асинхронно выполняет один цикл опроса всех локаций реестра.
+
+        Returns:
+            CycleStats: статистика цикла.
+        """
+
+        stats = CycleStats()
+        started_at = time.monotonic()
+
+        # Опрашиваем только локации, для которых в API могли появиться новые данные
+        locations = self.weather_api.filter_stale_coordinates(self.locations)
+        stats.skipped = len(self.locations) - len(locations)
+
+        await asyncio.gather(
+            *(self.fetch_and_store_chunk(chunk, stats) for chunk in self.weather_api.chunk_coordinates(locations))
+        )
+
+        stats.wall_time = time.monotonic() - started_at
+
+        return stats
@@ -5,16 +5,16 @@ from pathlib import Path
 from dotenv import load_dotenv
 
 from .API_manager import APIManager
+from .Archive_manager import ArchiveManager
+from .Buffer_manager import BufferManager
 from .DB_manager import DBManager
 from .Excel_manager import ExcelManager
+from .Export_manager import EXPORT_FORMATS, get_exporter
+from .Fleet_manager import FleetManager
 
 
-def get_data_from_env() -> None:
-    """Получает данные из переменных окружения.
-
-    Returns:
-        args: широта, долгота и периодичность запросов.
-    """
+def load_env() -> None:
+    """Загружает переменные окружения из файла .env в корне проекта, если он существует."""
 
     # Получаем путь к файлу, находящемуся на уровень выше
     BASE_DIR = Path(__file__).resolve().parent.parent
@@ -24,6 +24,34 @@ def get_data_from_env() -> None:
     if dotenv_path.exists():
         load_dotenv(dotenv_path, override=True)
 
+
+def get_bool_from_env(name: str, default: bool = False) -> bool:
+    """Получает логическое значение из переменной окружения.
+
+    Args:
+        name (str): имя переменной окружения.
+        default (bool): значение по умолчанию.
+
+    Returns:
+        bool: значение переменной окружения.
+    """
+
+    value = os.environ.get(name)
+    if value is None:
+        return default
+
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_data_from_env() -> None:
+    """Получает данные из переменных окружения.
+
+    Returns:
+        args: широта, долгота и периодичность запросов.
+    """
+
+    load_env()
+
     LATITUDE = float(os.environ.get("LATITUDE", 52.54))  # Широта
     LONGITUDE = float(os.environ.get("LONGITUDE", 13.41))  # Долгота
     FREQUENCY = int(os.environ.get("FREQUENCY", 180))  # Периодичность запросов
@@ -31,22 +59,170 @@ def get_data_from_env() -> None:
     return LATITUDE, LONGITUDE, FREQUENCY
 
 
+def get_api_settings_from_env() -> dict:
+    """Получает настройки HTTP-клиента API из переменных окружения.
+
+    Returns:
+        dict: именованные аргументы для APIManager.
+    """
+
+    load_env()
+
+    return {
+        "max_connections": int(os.environ.get("HTTP_MAX_CONNECTIONS", 100)),  # Максимум соединений
+        "max_keepalive_connections": int(os.environ.get("HTTP_MAX_KEEPALIVE", 20)),  # Максимум keep-alive соединений
+        "keepalive_expiry": float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", 30.0)),  # Время жизни соединения (с)
+        "http2": get_bool_from_env("HTTP2"),  # Использовать HTTP/2
+        "timeout": float(os.environ.get("HTTP_TIMEOUT", 10.0)),  # Таймаут запроса (с)
+        "use_cache": get_bool_from_env("API_CACHE", True),  # Не запрашивать данные до их обновления в API
+    }
+
+
+def get_db_settings_from_env() -> dict:
+    """Получает настройки базы данных из переменных окружения.
+
+    Returns:
+        dict: именованные аргументы для DBManager.
+    """
+
+    load_env()
+
+    retention_months = os.environ.get("DB_RETENTION_MONTHS")
+
+    return {
+        "db_url": os.environ.get("DB_URL", "sqlite+aiosqlite:///weather_data.db"),  # url базы данных
+        "sqlite_profile": os.environ.get("SQLITE_PROFILE", "performance"),  # Профиль настроек SQLite
+        "partitioning": get_bool_from_env("DB_PARTITIONING", False),  # Помесячные секции таблицы weather_data
+        "retention_months": int(retention_months) if retention_months else None,  # Срок хранения (месяцев)
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 10)),  # Размер пула соединений PostgreSQL
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 20)),  # Дополнительные соединения PostgreSQL
+        "copy_threshold": int(os.environ.get("DB_COPY_THRESHOLD", 100)),  # Размер пакета для загрузки через COPY
+        "on_conflict": os.environ.get("DB_ON_CONFLICT", "ignore"),  # Обработка повторных измерений
+        "change_only": get_bool_from_env("DB_CHANGE_ONLY", False),  # Сохранять только изменившиеся измерения
+    }
+
+
+def get_archive_settings_from_env() -> dict:
+    """Получает настройки архива Parquet из переменных окружения.
+
+    Returns:
+        dict: каталог архива, именованные аргументы для ArchiveManager и периодичность переноса в архив.
+    """
+
+    load_env()
+
+    return {
+        "path": os.environ.get("ARCHIVE_PATH", ""),  # Каталог архива (пусто - архив отключен)
+        "max_age_days": int(os.environ.get("ARCHIVE_MAX_AGE_DAYS", 90)),  # Возраст записей для переноса (дней)
+        "interval": int(os.environ.get("ARCHIVE_INTERVAL", 86400)),  # Периодичность переноса (с)
+    }
+
+
+def get_excel_settings_from_env() -> dict:
+    """Получает настройки выгрузки в Excel из переменных окружения.
+
+    Returns:
+        dict: именованные аргументы для ExcelManager.
+    """
+
+    load_env()
+
+    return {
+        "max_rows": int(os.environ.get("EXCEL_MAX_ROWS", 1048575)),  # Максимум записей на листе
+        "split": os.environ.get("EXCEL_SPLIT", "sheet"),  # Продолжение выгрузки при заполнении листа
+    }
+
+
+def get_export_settings_from_env() -> dict:
+    """Получает настройки выгрузки в другие форматы из переменных окружения.
+
+    Returns:
+        dict: формат выгрузки, предлагаемый в меню по умолчанию.
+    """
+
+    load_env()
+
+    return {
+        "export_format": os.environ.get("EXPORT_FORMAT", "csv"),  # Формат выгрузки по умолчанию
+    }
+
+
+def get_fleet_settings_from_env() -> dict:
+    """Получает настройки опроса множества локаций из переменных окружения.
+
+    Returns:
+        dict: путь к реестру локаций и именованные аргументы для FleetManager.
+    """
+
+    load_env()
+
+    return {
+        "locations_file": os.environ.get("LOCATIONS_FILE"),  # Файл с реестром локаций
+        "max_concurrency": int(os.environ.get("FLEET_CONCURRENCY", 10)),  # Максимум одновременных запросов
+        "rate": float(os.environ.get("FLEET_RATE", 10.0)),  # Максимальная частота запросов (запросов в секунду)
+        "burst": int(os.environ.get("FLEET_BURST", 10)),  # Максимум запросов без ожидания
+    }
+
+
+def get_buffer_settings_from_env() -> dict:
+    """Получает настройки буфера отложенной записи из переменных окружения.
+
+    Returns:
+        dict: именованные аргументы для BufferManager.
+    """
+
+    load_env()
+
+    return {
+        "max_rows": int(os.environ.get("BUFFER_MAX_ROWS", 500)),  # Максимум записей в пакете
+        "flush_interval_ms": int(os.environ.get("BUFFER_FLUSH_MS", 1000)),  # Максимальное время ожидания пакета (мс)
+        "max_queue": int(os.environ.get("BUFFER_MAX_QUEUE", 10000)),  # Максимальный размер очереди
+    }
+
+
+def get_locations_from_file(path: str) -> list[tuple[float, float]]:
+    """Загружает реестр локаций из текстового файла.
+
+    Каждая строка файла содержит широту и долготу через запятую, строки, начинающиеся с "#", игнорируются.
+
+    Args:
+        path (str): путь к файлу с реестром локаций.
+
+    Returns:
+        list[tuple[float, float]]: список пар (широта, долгота).
+    """
+
+    locations = []
+
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            latitude, longitude = line.split(",")
+            locations.append((float(latitude), float(longitude)))
+
+    return locations
+
+
 async def fetch_and_store_weather_data(
-    weather_api: APIManager, db_manager: DBManager, frequency: int, stop_event: asyncio.Event
+    weather_api: APIManager, db_manager: DBManager | BufferManager, frequency: int, stop_event: asyncio.Event
 ) -> None:
     """Асинхронная функция для периодической выборки данных о погоде и их сохранения в базу данных.
 
     Args:
         weather_api (APIManager): менеджер api.
-        db_manager (DBManager): менеджер базы данных.
+        db_manager (DBManager | BufferManager): менеджер базы данных или буфер отложенной записи.
         frequency (int): периодичность запросов.
         stop_event (asyncio.Event): сигнал о завершении программы.
     """
 
     while not stop_event.is_set():
         try:
-            data = await weather_api.get_weather_data()
-            await db_manager.add_weather_data(data)
+            # Пока данные в API не обновились, повторно их не сохраняем
+            data = await weather_api.get_weather_data(only_new=True)
+            if data is not None:
+                await db_manager.add_weather_data(data)
         except Exception as e:
             print(f"Ошибка при получении или сохранении данных: {e}")
 
@@ -58,31 +234,164 @@ async def fetch_and_store_weather_data(
         await asyncio.sleep(frequency)
 
 
-async def menu(db_manager: DBManager, excel_manager: ExcelManager, stop_event: asyncio.Event) -> None:
+async def fetch_and_store_fleet_weather_data(
+    fleet_manager: FleetManager, frequency: int, stop_event: asyncio.Event
+) -> None:
+    """Асинхронная функция для периодического опроса всех локаций реестра и сохранения данных в базу данных.
+
+    Args:
+        fleet_manager (FleetManager): менеджер опроса локаций.
+        frequency (int): периодичность опроса всех локаций.
+        stop_event (asyncio.Event): сигнал о завершении программы.
+    """
+
+    while not stop_event.is_set():
+        stats = await fleet_manager.run_cycle()
+        print(
+            f"Цикл опроса: успешно - {stats.completed}, с ошибкой - {stats.failed}, без изменений - {stats.skipped}, "
+            f"запросов - {stats.requests}, время - {stats.wall_time:.2f} c."
+        )
+
+        if stats.wall_time > frequency:
+            print(f"Цикл опроса занял больше периода опроса ({frequency} c.).")
+
+        # Проверяем, установлено ли событие после опроса
+        if stop_event.is_set():
+            break
+
+        # Ожидание до начала следующего цикла
+        await asyncio.sleep(max(0, frequency - stats.wall_time))
+
+
+async def compact_weather_data(archive_manager: ArchiveManager, interval: int, stop_event: asyncio.Event) -> None:
+    """Асинхронная функция для периодического переноса давних записей о погоде в архив Parquet.
+
+    Args:
+        archive_manager (ArchiveManager): менеджер архива.
+        interval (int): периодичность переноса (с).
+        stop_event (asyncio.Event): сигнал о завершении программы.
+    """
+
+    while not stop_event.is_set():
+        try:
+            moved = await archive_manager.compact()
+        except Exception as e:
+            print(f"Ошибка при переносе данных в архив: {e}")
+        else:
+            if moved:
+                print(f"В архив перенесено записей: {moved}")
+
+        # Ожидание до следующего переноса прерывается при завершении программы
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+def report_export(task: asyncio.Task) -> None:
+    """Сообщает о завершении фоновой выгрузки в файл.
+
+    Args:
+        task (asyncio.Task): завершенная задача выгрузки.
+    """
+
+    if task.cancelled():
+        print("Экспорт отменен.")
+    elif task.exception() is not None:
+        print(f"Ошибка при экспорте данных: {task.exception()}")
+    elif task.result() is None:
+        print("Экспорт завершен: новых записей нет.")
+    else:
+        print(f"Экспорт завершен: {task.result()}.")
+
+
+async def menu(
+    db_manager: DBManager,
+    excel_manager: ExcelManager,
+    stop_event: asyncio.Event,
+    archive_manager: ArchiveManager | None = None,
+    export_format: str = "csv",
+) -> None:
     """Асинхронное меню для управления программой.
 
     Args:
         db_manager (DBManager): менеджер базы данных.
         excel_manager (ExcelManager): менеджер Excel.
         stop_event (asyncio.Event): сигнал о завершении программы.
+        archive_manager (ArchiveManager | None): менеджер архива Parquet (None - архив отключен).
+        export_format (str): формат выгрузки, предлагаемый по умолчанию (ключ EXPORT_FORMATS).
     """
 
+    # Фоновые выгрузки в файлы: меню не ожидает их завершения
+    export_jobs = []
+    incremental_export = None
+
     while True:
         print("\nМеню:")
         print("1. Экспорт данных в Excel.")
         print("2. Выйти из программы.")
+        print("3. Пересчитать почасовые и посуточные агрегаты.")
+        print("4. Перенести давние данные в архив Parquet.")
+        print("5. Показать текущую погоду по локациям.")
+        print("6. Экспорт в Excel только новых записей (с момента предыдущего такого экспорта).")
+        print(f"7. Экспорт данных в другом формате ({', '.join(EXPORT_FORMATS)}).")
 
-        choice = await asyncio.get_event_loop().run_in_executor(None, input, "Выберите действие (1 или 2): ")
+        choice = await asyncio.get_event_loop().run_in_executor(None, input, "Выберите действие (1-7): ")
 
         if choice == "1":
-            print("Экспорт данных в Excel...")
-            await excel_manager.create_excel_file()
-            data = await db_manager.get_all_weather_data()
-            await excel_manager.add_weather_data_to_excel(data)
-            print("Экспорт завершен.")
+            job = excel_manager.start_export(db_manager.iter_weather_rows())
+            job.task.add_done_callback(report_export)
+            export_jobs = [job for job in export_jobs if not job.done()] + [job]
+            print("Экспорт данных в Excel запущен в фоновом режиме.")
         elif choice == "2":
             print("Выход из программы...")
             stop_event.set()
+
+            pending = [job for job in export_jobs if not job.done()]
+            if pending:
+                print("Ожидание завершения экспорта...")
+                await asyncio.gather(*pending, return_exceptions=True)
             break
+        elif choice == "3":
+            print("Пересчет агрегатов...")
+            await db_manager.rebuild_rollups()
+            print("Пересчет завершен.")
+        elif choice == "4":
+            if archive_manager is None:
+                print("Архив не настроен (переменная окружения ARCHIVE_PATH).")
+                continue
+            print("Перенос данных в архив...")
+            moved = await archive_manager.compact()
+            print(f"Перенос завершен, записей: {moved}.")
+        elif choice == "5":
+            # Последние измерения берутся из кэша менеджера базы данных без запросов к БД
+            for (latitude, longitude), row in db_manager.get_latest_many().items():
+                data = row.to_dict()
+                print(
+                    f"{latitude}, {longitude} ({data['datetime_weather']:%Y-%m-%d %H:%M}): {row.temperature_2m} °C, "
+                    f"{row.type_precipitation} {row.precipitation} мм, {row.pressure_msl} мм рт.ст., "
+                    f"ветер {row.wind_direction_10m} {row.wind_speed_10m} м/с"
+                )
+        elif choice == "6":
+            # Пока предыдущий инкрементальный экспорт не сдвинул отметку, новый выгрузил бы те же записи
+            if incremental_export is not None and not incremental_export.done():
+                print("Экспорт новых записей уже выполняется.")
+                continue
+            incremental_export = asyncio.create_task(excel_manager.export_new_weather_rows(db_manager))
+            incremental_export.add_done_callback(report_export)
+            export_jobs = [job for job in export_jobs if not job.done()] + [incremental_export]
+            print("Экспорт новых записей в Excel запущен в фоновом режиме.")
+        elif choice == "7":
+            prompt = f"Формат ({', '.join(EXPORT_FORMATS)}) [{export_format}]: "
+            name = (await asyncio.get_event_loop().run_in_executor(None, input, prompt)).strip() or export_format
+            try:
+                exporter = get_exporter(name)
+            except (ValueError, ImportError) as e:
+                print(e)
+                continue
+            job = exporter.start_export(db_manager.iter_weather_rows())
+            job.task.add_done_callback(report_export)
+            export_jobs = [job for job in export_jobs if not job.done()] + [job]
+            print(f"Экспорт данных в {name} запущен в фоновом режиме.")
         else:
             print("Неверный выбор. Пожалуйста, попробуйте снова.")
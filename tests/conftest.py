@@ -0,0 +1,23 @@
+from datetime import datetime, timedelta
+
+
+def make_weather_data(index: int) -> dict:
+    """Возвращает запись о погоде для index-го измерения с шагом 15 минут начиная с 1 января 2024 года."""
+
+    moment = datetime(2024, 1, 1) + timedelta(minutes=15 * index)
+
+    return {
+        "latitude": 52.54,
+        "longitude": 13.41,
+        "timezone": "GMT",
+        "utc_offset_seconds": 0,
+        "datetime_request": moment,
+        "datetime_weather": moment,
+        "temperature_2m": float(index % 30),
+        "precipitation": 0.0,
+        "type_precipitation": "отсутствуют",
+        "pressure_msl": 750.0,
+        "wind_speed_10m": 3.0,
+        "wind_direction_10m": "С",
+        "wind_direction_degrees": 0.0,
+    }
@@ -0,0 +1,26 @@
+import asyncio
+
+from src.Buffer_manager import BufferManager
+from src.DB_manager import DBManager
+from tests.conftest import make_weather_data
+
+
+def test_flush_keeps_valid_rows_of_failed_batch(tmp_path):
+    """Ошибка в одной записи пакета не отменяет сохранение остальных записей пакета."""
+
+    async def run() -> int:
+        db_manager = DBManager(f"sqlite+aiosqlite:///{tmp_path / 'weather.db'}")
+        await db_manager.init_db()
+
+        buffer_manager = BufferManager(db_manager, max_rows=10)
+        buffer_manager.start()
+        await buffer_manager.add_weather_data_many([make_weather_data(index) for index in range(9)])
+        await buffer_manager.add_weather_data({**make_weather_data(9), "type_precipitation": "град"})
+        await buffer_manager.close()
+
+        rows = await db_manager.get_weather_rows()
+        await db_manager.engine.dispose()
+
+        return len(rows)
+
+    assert asyncio.run(run()) == 9
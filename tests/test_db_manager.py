@@ -0,0 +1,254 @@
+import asyncio
+import os
+from datetime import datetime
+
+import pytest
+
+from src.DB_manager import DBManager
+from tests.conftest import make_weather_data
+
+# url пустой базы данных PostgreSQL для тестов, например postgresql+asyncpg://postgres@localhost:5432/weather_test;
+# все таблицы базы данных удаляются перед каждым тестом. Без него тесты выполняются только с SQLite
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+# Порог загрузки командой COPY в тестах; второй вариант порога не достигается, и пакеты вставляются INSERT
+COPY_THRESHOLD = 100
+COPY_THRESHOLDS = pytest.mark.parametrize("copy_threshold", [COPY_THRESHOLD, 1000000], ids=["copy", "executemany"])
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def db_url(request, tmp_path):
+    """Пустая база данных: временный файл SQLite или база данных PostgreSQL из TEST_DATABASE_URL."""
+
+    if request.param == "sqlite":
+        return f"sqlite+aiosqlite:///{tmp_path / 'weather.db'}"
+    if not TEST_DATABASE_URL:
+        pytest.skip("не задан TEST_DATABASE_URL с базой данных PostgreSQL")
+
+    async def reset() -> None:
+        db_manager = DBManager(TEST_DATABASE_URL)
+        async with db_manager.engine.begin() as conn:
+            await conn.exec_driver_sql("DROP SCHEMA public CASCADE")
+            await conn.exec_driver_sql("CREATE SCHEMA public")
+        await db_manager.engine.dispose()
+
+    asyncio.run(reset())
+
+    return TEST_DATABASE_URL
+
+
+async def count_rows(db_url: str, partitioning: bool) -> tuple[int, int]:
+    """Возвращает количество сохраненных записей и суммарное количество измерений в посуточных агрегатах."""
+
+    db_manager = DBManager(db_url, partitioning=partitioning)
+    await db_manager.init_db()
+    rows = await db_manager.get_all_weather_data()
+    rollups = await db_manager.get_rollups("day")
+    await db_manager.engine.dispose()
+
+    return len(rows), sum(rollup["observations"] for rollup in rollups)
+
+
+def skip_copy_without_postgresql(db_url: str, copy_threshold: int) -> None:
+    """Пропускает тест загрузки командой COPY, если база данных - не PostgreSQL."""
+
+    if copy_threshold == COPY_THRESHOLD and not db_url.startswith("postgresql"):
+        pytest.skip("загрузка командой COPY выполняется только в PostgreSQL")
+
+
+@pytest.mark.parametrize("partitioning", [False, True])
+@COPY_THRESHOLDS
+def test_insert_ignores_repeated_observations(db_url, partitioning, copy_threshold):
+    """Пакет сохраняется командой COPY или INSERT в режиме executemany, повторные измерения пропускаются."""
+
+    skip_copy_without_postgresql(db_url, copy_threshold)
+
+    async def run() -> None:
+        db_manager = DBManager(db_url, partitioning=partitioning, copy_threshold=copy_threshold)
+        await db_manager.init_db()
+        await db_manager.add_weather_data(make_weather_data(0))
+        await db_manager.add_weather_data_many([make_weather_data(index) for index in range(3000)])
+        await db_manager.add_weather_data_many([make_weather_data(index) for index in range(2000, 4000)])
+        await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+    assert asyncio.run(count_rows(db_url, partitioning)) == (4000, 4000)
+
+
+@pytest.mark.parametrize("partitioning", [False, True])
+@COPY_THRESHOLDS
+def test_insert_updates_repeated_observations(db_url, partitioning, copy_threshold):
+    """В режиме "update" повторные измерения заменяют сохраненные значения и пересчитывают агрегаты."""
+
+    skip_copy_without_postgresql(db_url, copy_threshold)
+
+    async def run() -> list[dict]:
+        db_manager = DBManager(db_url, partitioning=partitioning, copy_threshold=copy_threshold, on_conflict="update")
+        await db_manager.init_db()
+        await db_manager.add_weather_data_many([make_weather_data(index) for index in range(3000)])
+        await db_manager.add_weather_data_many(
+            [{**make_weather_data(index), "temperature_2m": 100.0} for index in range(3000)]
+        )
+        rollups = await db_manager.get_rollups("day")
+        await db_manager.engine.dispose()
+
+        return rollups
+
+    rollups = asyncio.run(run())
+
+    assert asyncio.run(count_rows(db_url, partitioning)) == (3000, 3000)
+    assert all(rollup["temperature_min"] == rollup["temperature_max"] == 100.0 for rollup in rollups)
+
+
+@pytest.mark.parametrize("partitioning", [False, True])
+def test_change_only_extends_unchanged_observations(db_url, partitioning):
+    """В режиме хранения изменений неизменные измерения продлевают запись, а агрегаты учитывают каждое измерение."""
+
+    async def run() -> tuple[list, list]:
+        db_manager = DBManager(db_url, partitioning=partitioning, change_only=True)
+        await db_manager.init_db()
+        # Значения меняются каждые 10 измерений
+        weather_data = [{**make_weather_data(index), "temperature_2m": float(index // 10)} for index in range(3000)]
+        await db_manager.add_weather_data_many(weather_data[:1500])
+        for start in range(1500, 3000, 100):
+            await db_manager.add_weather_data_many(weather_data[start:start + 100])
+        rows = await db_manager.get_weather_rows()
+        expanded = await db_manager.get_weather_rows(expand=True)
+        await db_manager.engine.dispose()
+
+        return rows, expanded
+
+    rows, expanded = asyncio.run(run())
+
+    assert len(rows) == 300
+    assert len(expanded) == 3000
+    assert asyncio.run(count_rows(db_url, partitioning)) == (300, 3000)
+
+
+def test_concurrent_partition_creation(db_url):
+    """Несколько менеджеров одновременно создают одни и те же секции без ошибок и взаимных блокировок."""
+
+    async def run() -> list:
+        db_managers = [DBManager(db_url, partitioning=True) for _ in range(6)]
+        for db_manager in db_managers:
+            await db_manager.init_db()
+
+        results = await asyncio.gather(
+            *(
+                db_manager.add_weather_data_many([make_weather_data(index + 50 * number) for index in range(3000)])
+                for number, db_manager in enumerate(db_managers)
+            ),
+            return_exceptions=True,
+        )
+        for db_manager in db_managers:
+            await db_manager.engine.dispose()
+
+        return results
+
+    assert asyncio.run(run()) == [None] * 6
+    assert asyncio.run(count_rows(db_url, True)) == (3250, 3250)
+
+
+def test_partitions_created_and_dropped_by_other_managers(db_url):
+    """Менеджер читает секции, созданные другим менеджером, и заново создает секцию, удаленную другим менеджером."""
+
+    async def run() -> tuple[int, int]:
+        reader, writer = DBManager(db_url, partitioning=True), DBManager(db_url, partitioning=True)
+        await reader.init_db()
+        await writer.init_db()
+
+        # Январь и февраль 2024 года
+        await writer.add_weather_data_many([make_weather_data(index) for index in range(0, 5000, 2)])
+        visible = len(await reader.get_weather_rows())
+
+        await reader.drop_partitions_before(datetime(2024, 2, 1))
+        await writer.add_weather_data(make_weather_data(1))
+        stored = len(await reader.get_weather_rows(until=datetime(2024, 2, 1)))
+
+        await reader.engine.dispose()
+        await writer.engine.dispose()
+
+        return visible, stored
+
+    assert asyncio.run(run()) == (2500, 1)
+
+
+def test_epoch_after_2038(db_url):
+    """Дата и время после 19 января 2038 года сохраняются и читаются без переполнения (столбцы BIGINT)."""
+
+    moment = datetime(2040, 1, 1)
+
+    async def run() -> tuple[list, list]:
+        db_manager = DBManager(db_url)
+        await db_manager.init_db()
+        await db_manager.add_weather_data(
+            {**make_weather_data(0), "datetime_request": moment, "datetime_weather": moment}
+        )
+        rows = await db_manager.get_weather_data()
+        rollups = await db_manager.get_rollups("day")
+        await db_manager.engine.dispose()
+
+        return rows, rollups
+
+    rows, rollups = asyncio.run(run())
+
+    assert [row["datetime_weather"] for row in rows] == [moment]
+    assert [rollup["bucket"] for rollup in rollups] == [moment]
+
+
+def test_latest_matches_stored_row(db_url):
+    """Последнее измерение из кэша совпадает с прочитанной из базы данных записью, включая типы значений."""
+
+    async def run() -> tuple:
+        db_manager = DBManager(db_url)
+        await db_manager.init_db()
+        await db_manager.add_weather_data({**make_weather_data(0), "temperature_2m": 3.0})
+        latest = db_manager.get_latest((52.54, 13.41))
+        rows = await db_manager.get_weather_rows()
+        await db_manager.engine.dispose()
+
+        return latest, rows[-1]
+
+    latest, stored = asyncio.run(run())
+
+    assert latest == stored
+    assert [type(value) for value in latest] == [type(value) for value in stored]
+
+
+@pytest.mark.parametrize(
+    "arguments",
+    [
+        {"metric": "humidity"},
+        {"metric": "temperature_2m", "fn": "median"},
+        {"metric": "temperature_2m", "bucket": "week"},
+        {"metric": "temperature_2m", "bucket": 0},
+        {"metric": "temperature_2m", "source": "cache"},
+    ],
+)
+def test_aggregate_rejects_unknown_arguments(tmp_path, arguments):
+    """Неизвестные показатель, функция, интервал группировки и источник данных отклоняются с ValueError."""
+
+    async def run() -> None:
+        db_manager = DBManager(f"sqlite+aiosqlite:///{tmp_path / 'weather.db'}")
+        try:
+            await db_manager.aggregate(**arguments)
+        finally:
+            await db_manager.engine.dispose()
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+
+def test_get_rollups_rejects_unknown_grain(tmp_path):
+    """Неизвестная длительность интервала агрегатов отклоняется с ValueError."""
+
+    async def run() -> None:
+        db_manager = DBManager(f"sqlite+aiosqlite:///{tmp_path / 'weather.db'}")
+        try:
+            await db_manager.get_rollups("week")
+        finally:
+            await db_manager.engine.dispose()
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
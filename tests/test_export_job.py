@@ -0,0 +1,180 @@
+import asyncio
+import csv
+import time
+
+import pytest
+
+from src.DB_manager import DBManager, WeatherRow
+from src.Excel_manager import ExcelManager
+from src.Export_manager import get_exporter
+from tests.conftest import make_weather_data
+
+# Допустимая задержка цикла событий (с): выгрузка в цикле событий давала ~0.5 с, в рабочем процессе - ~0.05 с
+MAX_LATENCY = 0.25
+
+
+async def measure_latency(db_manager: DBManager, job, start: int) -> list[float]:
+    """Асинхронно сохраняет записи по одной, пока выполняется выгрузка, и возвращает время каждой записи (с)."""
+
+    latencies = []
+    index = start
+    while not job.done():
+        started_at = time.perf_counter()
+        await db_manager.add_weather_data(make_weather_data(index))
+        latencies.append(time.perf_counter() - started_at)
+        index += 1
+        await asyncio.sleep(0.02)
+
+    return latencies
+
+
+@pytest.fixture
+def db_url(tmp_path, monkeypatch):
+    """База данных SQLite с 30000 записями о погоде; файлы выгрузки создаются во временном каталоге."""
+
+    monkeypatch.chdir(tmp_path)
+    url = f"sqlite+aiosqlite:///{tmp_path / 'weather.db'}"
+
+    async def fill() -> None:
+        db_manager = DBManager(url)
+        await db_manager.init_db()
+        await db_manager.add_weather_data_many([make_weather_data(index) for index in range(30000)])
+        await db_manager.engine.dispose()
+
+    asyncio.run(fill())
+
+    return url
+
+
+def test_ingest_latency_during_export(db_url):
+    """Запись в базу данных во время выгрузки в Excel не останавливается дольше MAX_LATENCY."""
+
+    async def run() -> tuple[str, list[float], int]:
+        db_manager = DBManager(db_url)
+        await db_manager.init_db()
+
+        job = ExcelManager().start_export(db_manager.iter_weather_rows())
+        latencies = await measure_latency(db_manager, job, 100000)
+        file_name = await job
+        await db_manager.engine.dispose()
+
+        return file_name, latencies, job.rows_written
+
+    file_name, latencies, rows_written = asyncio.run(run())
+
+    assert rows_written >= 30000
+    assert latencies
+    assert max(latencies) < MAX_LATENCY
+    assert file_name.endswith(".xlsx")
+
+
+def test_cancel_does_not_block_event_loop(tmp_path, monkeypatch):
+    """Отмена выгрузки не останавливает цикл событий до окончания записи пакета и удаляет недописанный файл."""
+
+    monkeypatch.chdir(tmp_path)
+
+    async def batches():
+        for start in range(0, 200000, 20000):
+            yield [
+                WeatherRow(
+                    index, 52.54, 13.41, "GMT", 0, 1704067200 + index * 900, 1704067200 + index * 900,
+                    1.0, 0.0, "отсутствуют", 750.0, 3.0, "С", 0.0, 1704067200 + index * 900, 1,
+                )
+                for index in range(start, start + 20000)
+            ]
+
+    async def run() -> float:
+        job = ExcelManager(max_rows=10000, split="file").start_export(batches())
+
+        # Дожидаемся, пока рабочий процесс начнет записывать пакеты
+        while job.rows_written < 40000:
+            await asyncio.sleep(0.01)
+
+        lags = []
+
+        async def heartbeat() -> None:
+            while True:
+                started_at = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lags.append(time.perf_counter() - started_at - 0.01)
+
+        beating = asyncio.create_task(heartbeat())
+        job.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await job
+
+        # Задержка, накопленная во время отмены, фиксируется следующим срабатыванием
+        await asyncio.sleep(0.05)
+        beating.cancel()
+
+        return max(lags, default=0.0)
+
+    assert asyncio.run(run()) < MAX_LATENCY
+    assert not list(tmp_path.iterdir())
+
+
+def test_incremental_export_keeps_rows_added_to_read_partitions(tmp_path, monkeypatch):
+    """Запись, сохраненная во время инкрементальной выгрузки в уже прочитанную секцию, попадает в следующую выгрузку."""
+
+    monkeypatch.chdir(tmp_path)
+
+    async def run() -> list[set[int]]:
+        db_manager = DBManager(f"sqlite+aiosqlite:///{tmp_path / 'weather.db'}", partitioning=True)
+        await db_manager.init_db()
+        # Январь и февраль 2024 года
+        await db_manager.add_weather_data_many([make_weather_data(index) for index in range(0, 5000, 2)])
+
+        iter_weather_rows = db_manager.iter_weather_rows
+        late = [make_weather_data(1), make_weather_data(4999)]
+
+        async def iter_with_late_rows(*args, **kwargs):
+            async for rows in iter_weather_rows(*args, **kwargs):
+                yield rows
+                # После первого пакета январской секции сохраняются запись за январь и запись за февраль
+                if late:
+                    await db_manager.add_weather_data_many([late.pop(0), late.pop(0)])
+
+        monkeypatch.setattr(db_manager, "iter_weather_rows", iter_with_late_rows)
+
+        exported = []
+        exporter = get_exporter("csv")
+        for _ in range(2):
+            with open(await exporter.export_new_weather_rows(db_manager), encoding="utf-8") as file:
+                exported.append({int(row[0]) for row in list(csv.reader(file))[1:]})
+
+        await db_manager.engine.dispose()
+
+        return exported
+
+    first, second = asyncio.run(run())
+
+    assert first == set(range(1, 2501))
+    assert second == {2501, 2502}
+    assert sorted(path.name.split("_ids_")[1] for path in tmp_path.glob("*.csv")) == ["1-2500.csv", "2501-2502.csv"]
+
+
+def test_simultaneous_exports_write_separate_files(tmp_path, monkeypatch):
+    """Выгрузки, запущенные в одну секунду, сохраняются в разные файлы."""
+
+    monkeypatch.chdir(tmp_path)
+
+    async def batches():
+        yield [
+            WeatherRow(
+                index, 52.54, 13.41, "GMT", 0, 1704067200 + index * 900, 1704067200 + index * 900,
+                1.0, 0.0, "отсутствуют", 750.0, 3.0, "С", 0.0, 1704067200 + index * 900, 1,
+            )
+            for index in range(10)
+        ]
+
+    async def run() -> list[str]:
+        exporter = get_exporter("csv")
+
+        return await asyncio.gather(exporter.start_export(batches()), exporter.start_export(batches()))
+
+    file_names = asyncio.run(run())
+
+    assert len(set(file_names)) == 2
+    for file_name in file_names:
+        with open(file_name, encoding="utf-8") as file:
+            assert len(list(csv.reader(file))) == 11